@@ -15,18 +15,32 @@ Inkluderer:
 - MR (fylke=15) FV
 - Vestland FV61 i Stad kommune 4649 (Bryggja-området)
 
-Krever: ArcGIS Pro Python (arcpy), requests
+Krever: ArcGIS Pro Python (arcpy), requests (valgfritt: ijson med yajl2_c-backend for strømming av NVDB-sider)
 """
 
 from __future__ import annotations
 
 import os
+import queue
+import statistics
+import threading
 import time
+from collections import defaultdict
 from typing import Any, Dict, Iterable, Optional
 
 import arcpy
 import requests
 
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Ren Python-backend i ijson er tregere enn r.json(); strøm bare med C-backenden
+IJSON_BACKEND = getattr(ijson, "backend", None)
+if IJSON_BACKEND != "yajl2_c":
+    ijson = None
+
 arcpy.env.overwriteOutput = True
 
 # -------------------------
@@ -61,6 +75,7 @@ HEADERS = {
     "Accept": "application/vnd.vegvesen.nvdb-v3+json",
 }
 TIMEOUT = 60
+KO_MAKS = 20_000   # segmenter i kø mellom nedlasting og arcpy (≈ to sider) – holder minnet begrenset
 
 
 # -------------------------
@@ -79,6 +94,50 @@ def create_session() -> requests.Session:
     return s
 
 
+def log_komprimering(r: requests.Response, label: str, raw: Optional[int]) -> None:
+    """Logger om NVDB faktisk svarte komprimert (sjekkes på første side).
+
+    raw er ukomprimert størrelse, eller None når siden strømmes (ukjent før den er lest).
+    """
+    enc = r.headers.get("Content-Encoding")
+    if not enc:
+        log(f"⚠️ [{label}] Svaret er ikke komprimert (mangler Content-Encoding).")
+        return
+    wire = r.headers.get("Content-Length")
+    if wire and wire.isdigit() and raw:
+        log(f"[{label}] Content-Encoding={enc}: {int(wire):,} B over nett vs {raw:,} B ukomprimert "
+            f"({1 - int(wire) / raw:.0%} spart)")
+    else:
+        log(f"[{label}] Content-Encoding={enc}")
+
+
+def stream_side(r: requests.Response, meta: Dict[str, Any]) -> Iterable[Dict[str, Any]]:
+    """Strømmer objekter fra én NVDB-side med ijson, ett objekt om gangen.
+
+    metadata (kommer etter objekter i svaret) bygges underveis og legges i meta.
+    """
+    r.raw.decode_content = True
+    obj_builder = None
+    meta_builder = None
+    for prefix, event, value in ijson.parse(r.raw, use_float=True):
+        if obj_builder is None and prefix == "objekter.item" and event == "start_map":
+            obj_builder = ijson.ObjectBuilder()
+        if obj_builder is not None:
+            obj_builder.event(event, value)
+            if prefix == "objekter.item" and event == "end_map":
+                yield obj_builder.value
+                obj_builder = None
+            continue
+
+        if meta_builder is None and prefix == "metadata" and event == "start_map":
+            meta_builder = ijson.ObjectBuilder()
+        if meta_builder is not None:
+            meta_builder.event(event, value)
+            if prefix == "metadata" and event == "end_map":
+                meta.update(meta_builder.value)
+                meta_builder = None
+
+
 def iter_paged(
     session: requests.Session,
     url: str,
@@ -104,12 +163,13 @@ def iter_paged(
         if start:
             p["start"] = start
 
-        r = None
         for attempt in range(1, max_retries + 1):
+            r = None
             try:
-                r = session.get(next_url, params=p, timeout=TIMEOUT)
-                if r.status_code == 200:
+                r = session.get(next_url, params=p, timeout=TIMEOUT, stream=ijson is not None)
+                if r.status_code == 200 or attempt == max_retries:
                     break
+                r.close()   # strømmet svar: gi forbindelsen tilbake til poolen før neste forsøk
                 wait = retry_backoff * (2 ** (attempt - 1))
                 log(f"⚠️ [{label}] HTTP {r.status_code} (forsøk {attempt}/{max_retries}) — venter {wait:.0f}s...")
                 time.sleep(wait)
@@ -120,17 +180,33 @@ def iter_paged(
 
         if r is None or r.status_code != 200:
             status = r.status_code if r is not None else "N/A"
-            txt = r.text if r is not None else ""
+            txt = ""
+            if r is not None:
+                txt = r.text
+                r.close()
             raise RuntimeError(f"{label}: HTTP {status} etter {max_retries} forsøk. Svar: {txt[:800]}")
 
-        data = r.json()
-        objs = data.get("objekter", []) or []
-        if not objs:
+        if ijson is not None:
+            if page == 1:
+                log_komprimering(r, label, None)
+            meta: Dict[str, Any] = {}
+            n_objs = 0
+            for obj in stream_side(r, meta):
+                n_objs += 1
+                yield obj
+        else:
+            if page == 1:
+                log_komprimering(r, label, len(r.content))
+            data = r.json()
+            objs = data.get("objekter", []) or []
+            n_objs = len(objs)
+            yield from objs
+            meta = data.get("metadata") or {}
+
+        if not n_objs:
             return
 
-        yield from objs
-
-        nxt = (data.get("metadata") or {}).get("neste") or {}
+        nxt = meta.get("neste") or {}
         nxt_start = nxt.get("start")
         if nxt_start is not None:
             nxt_start = str(nxt_start)
@@ -213,7 +289,6 @@ def legg_til_kjoreloggfelter(fc: str) -> None:
         ("Kommentar_MBO", "TEXT", 255),
         ("Driftskontrakt", "TEXT", 150),
         ("Lengde_km", "DOUBLE", None),
-        ("KEY_DISS", "TEXT", 220),  # komposittnøkkel for median-join
     ]
     eksisterende = {f.name for f in arcpy.ListFields(fc)}
     for navn, ftype, lengde in wanted:
@@ -225,20 +300,27 @@ def legg_til_kjoreloggfelter(fc: str) -> None:
             arcpy.management.AddField(fc, navn, ftype)
 
 
-def setup_domain(gdb: str) -> None:
-    domain = "StatusMal_Domain"
-    domains = [d.name for d in arcpy.da.ListDomains(gdb)]
-    if domain not in domains:
-        arcpy.management.CreateDomain(gdb, domain, "Status måling", "TEXT", "CODED")
-        for v in ["IKKE MÅLT", "PÅBEGYNT", "MÅLES IKKE", "FERDIG MÅLT"]:
-            arcpy.management.AddCodedValueToDomain(gdb, domain, v, v)
-        log("✓ Domain opprettet")
+STATUS_DOMAIN = "StatusMal_Domain"
+
+# (gdb, domain) som allerede er sjekket/opprettet i denne kjøringen
+_domener_klare: set[tuple[str, str]] = set()
+
 
-    arcpy.env.workspace = gdb
-    for fc in arcpy.ListFeatureClasses():
-        fnames = {f.name for f in arcpy.ListFields(fc)}
-        if "Status_Måling" in fnames:
-            arcpy.management.AssignDomainToField(fc, "Status_Måling", domain)
+def setup_domain(gdb: str, fc: str) -> None:
+    """Sørger for at domenet finnes (sjekkes én gang pr gdb) og kobler det til Status_Måling i fc."""
+    domain = STATUS_DOMAIN
+    if (gdb, domain) not in _domener_klare:
+        domains = [d.name for d in arcpy.da.ListDomains(gdb)]
+        if domain not in domains:
+            arcpy.management.CreateDomain(gdb, domain, "Status måling", "TEXT", "CODED")
+            for v in ["IKKE MÅLT", "PÅBEGYNT", "MÅLES IKKE", "FERDIG MÅLT"]:
+                arcpy.management.AddCodedValueToDomain(gdb, domain, v, v)
+            log("✓ Domain opprettet")
+        _domener_klare.add((gdb, domain))
+
+    fnames = {f.name for f in arcpy.ListFields(fc)}
+    if "Status_Måling" in fnames:
+        arcpy.management.AssignDomainToField(fc, "Status_Måling", domain)
 
 
 def init_status_ikke_malt(fc: str) -> None:
@@ -289,131 +371,166 @@ def calc_driftskontrakt(target_fc: str) -> None:
 # Lengde
 # -------------------------
 def beregn_lengde_km(fc: str) -> None:
-    # ArcPy parameter: Coordinate_System (stor C/S)
-    arcpy.management.AddGeometryAttributes(
-        fc,
-        "LENGTH_GEODESIC",
-        "KILOMETERS",
-        Coordinate_System=SR,
-    )
-    fields = [f.name for f in arcpy.ListFields(fc)]
-    src_field = "LENGTH_GEODESIC" if "LENGTH_GEODESIC" in fields else ("LENGTHGEODESIC" if "LENGTHGEODESIC" in fields else None)
-    if src_field:
-        if "Lengde_km" in fields:
-            arcpy.management.CalculateField(fc, "Lengde_km", f"!{src_field}!", "PYTHON3")
-        else:
-            arcpy.management.AlterField(fc, src_field, "Lengde_km", "Lengde_km")
+    # Geodetisk lengde rett fra SHAPE@ i én cursor-runde (ingen AddGeometryAttributes/CalculateField)
+    fields = {f.name for f in arcpy.ListFields(fc)}
+    if "Lengde_km" not in fields:
+        arcpy.management.AddField(fc, "Lengde_km", "DOUBLE")
+
+    with arcpy.da.UpdateCursor(fc, ["SHAPE@", "Lengde_km"]) as cur:
+        for shape, _ in cur:
+            cur.updateRow((shape, shape.getLength("GEODESIC", "KILOMETERS") if shape else None))
 
 
 # -------------------------
-# KEY for dissolve/median
+# Median pr dissolve-nøkkel
 # -------------------------
-def calc_key_diss(fc: str) -> None:
+DISSOLVE_FIELDS = ["TRAFIKANTGRP", "VEGKATEGORI", "VEGNUMMER", "Driftskontrakt"]
+
+
+def median_lengde_pr_nokkel(fc: str) -> Dict[tuple, float]:
+    """Én SearchCursor-runde: grupperer Lengde_km på dissolve-feltene og tar median i minnet."""
     fields = {f.name for f in arcpy.ListFields(fc)}
-    if not {"TRAFIKANTGRP", "VEGKATEGORI", "VEGNUMMER", "Driftskontrakt", "KEY_DISS"} <= fields:
-        raise RuntimeError("Mangler felt for KEY_DISS. Har du kjørt legg_til_kjoreloggfelter + join drift?")
+    if not set(DISSOLVE_FIELDS + ["Lengde_km"]) <= fields:
+        raise RuntimeError("Mangler felt for median. Har du kjørt legg_til_kjoreloggfelter + join drift?")
 
-    expr = (
-        "!TRAFIKANTGRP! + '|' + str(!VEGKATEGORI!) + '|' + str(!VEGNUMMER!) + '|' + "
-        "(str(!Driftskontrakt!) if !Driftskontrakt! else '')"
-    )
-    arcpy.management.CalculateField(fc, "KEY_DISS", expr, "PYTHON3")
+    grupper: Dict[tuple, list] = defaultdict(list)
+    with arcpy.da.SearchCursor(fc, DISSOLVE_FIELDS + ["Lengde_km"]) as cur:
+        for *key, lengde in cur:
+            if lengde is not None:
+                grupper[tuple(key)].append(lengde)
+
+    return {key: statistics.median(verdier) for key, verdier in grupper.items()}
 
 
 # -------------------------
 # 1) VEGNETT – segmentert fra NVDB
 # -------------------------
-def hent_vegnett_segmentert(
-    session: requests.Session,
-    gdb: str,
-    *,
-    out_name: str,
-    fylke: int,
-    vegsystemref: str,
-    trafikantgruppe: str,
-    kommune: Optional[int] = None,
-) -> str:
-    fc = create_fc(
-        gdb,
-        out_name,
-        "POLYLINE",
-        [
-            ("TRAFIKANTGRP", "TEXT", 1),
-            ("VEGKATEGORI", "TEXT", 1),
-            ("VEGNUMMER", "LONG"),
-            ("VEGREF", "TEXT", 50),
-            ("KOMMUNE", "TEXT", 60),
-            ("FYLKE_NAVN", "TEXT", 40),
-        ],
-    )
+# Skjema bygges én gang på modulnivå og deles av create_fc og InsertCursor
+VEGNETT_EKSTRA_FELT: list[tuple] = [
+    ("TRAFIKANTGRP", "TEXT", 1),
+    ("VEGKATEGORI", "TEXT", 1),
+    ("VEGNUMMER", "LONG"),
+    ("VEGREF", "TEXT", 50),
+    ("KOMMUNE", "TEXT", 60),
+    ("FYLKE_NAVN", "TEXT", 40),
+]
+VEGNETT_COLS = ("SHAPE@", "VEGLENKESEKV_ID", "STARTPOS", "SLUTTPOS") + tuple(f[0] for f in VEGNETT_EKSTRA_FELT)
+
+
+def opprett_vegnett_fc(gdb: str, name: str) -> str:
+    fc = create_fc(gdb, name, "POLYLINE", VEGNETT_EKSTRA_FELT)
+    # Spatial index bygges én gang etter bulk-innsetting, ikke vedlikeholdes per rad
+    arcpy.management.RemoveSpatialIndex(fc)
+    return fc
 
-    url = f"{VEGNETT_API}/veglenkesekvenser/segmentert"
+
+def vegnett_params(fylke: int, vegsystemref: str, kommune: Optional[int] = None) -> Dict[str, Any]:
     params: Dict[str, Any] = {
         "fylke": fylke,
         "vegsystemreferanse": vegsystemref,
-        "antall": 5000,
+        "antall": 10000,
         "inkluderAntall": "false",
         "srid": SRID,
     }
     if kommune is not None:
         params["kommune"] = kommune
+    return params
+
+
+_FERDIG = object()
 
-    cols = [
-        "SHAPE@",
-        "VEGLENKESEKV_ID",
-        "STARTPOS",
-        "SLUTTPOS",
-        "TRAFIKANTGRP",
-        "VEGKATEGORI",
-        "VEGNUMMER",
-        "VEGREF",
-        "KOMMUNE",
-        "FYLKE_NAVN",
-    ]
 
-    cnt = 0
-    with arcpy.da.InsertCursor(fc, cols) as cur:
-        for seg in iter_paged(session, url, params, label=f"vegnett_{out_name}"):
-            vr = seg.get("vegsystemreferanse", {}) or {}
-            tg = (vr.get("strekning", {}) or {}).get("trafikantgruppe")
-            if tg != trafikantgruppe:
-                continue
-
-            geom = to_geometry(seg.get("geometri"))
-            if not geom:
-                continue
-
-            vs = vr.get("vegsystem", {}) or {}
-            stre = vr.get("strekning", {}) or {}
-
-            vegref = None
-            if vs.get("vegkategori") and vs.get("nummer"):
-                vegref = f"{vs['vegkategori']}V{vs['nummer']}"
-                if stre.get("strekning") and stre.get("delstrekning"):
-                    vegref += f" S{stre['strekning']}D{stre['delstrekning']}"
-
-            loc = seg.get("lokasjon") or {}
-            kommune_s = str(loc["kommuner"][0]) if loc.get("kommuner") else None
-            fylke_s = str(loc["fylker"][0]) if loc.get("fylker") else None
-
-            cur.insertRow(
-                (
-                    geom,
-                    int(seg["veglenkesekvensid"]),
-                    float(seg.get("startposisjon", 0.0)),
-                    float(seg.get("sluttposisjon", 0.0)),
-                    tg,
-                    vs.get("vegkategori"),
-                    vs.get("nummer"),
-                    vegref,
-                    kommune_s,
-                    fylke_s,
-                )
+def last_ned_i_bakgrunn(jobber: list[tuple[str, Dict[str, Any]]]) -> list[queue.Queue]:
+    """Laster ned vegnett for jobbene (label, params) i en egen tråd, én kø pr jobb.
+
+    Bare rå NVDB-dicts går gjennom køen; arcpy-geometri lages i hovedtråden. Køene er
+    begrenset (KO_MAKS), så nedlastingen venter når hovedtråden ligger bak; jobbene
+    leses i samme rekkefølge som de lastes ned. Feil i tråden legges i køen og kastes
+    videre når køen leses.
+    """
+    url = f"{VEGNETT_API}/veglenkesekvenser/segmentert"
+    koer: list[queue.Queue] = [queue.Queue(maxsize=KO_MAKS) for _ in jobber]
+
+    def worker() -> None:
+        session: Optional[requests.Session] = None
+        for (label, params), q in zip(jobber, koer):
+            try:
+                session = session or create_session()
+                for seg in iter_paged(session, url, params, label=f"vegnett_{label}"):
+                    q.put(seg)
+            except Exception as e:
+                q.put(e)
+            finally:
+                q.put(_FERDIG)
+
+    threading.Thread(target=worker, name="nvdb_" + "_".join(j[0] for j in jobber), daemon=True).start()
+    return koer
+
+
+def fra_ko(q: queue.Queue) -> Iterable[Dict[str, Any]]:
+    while True:
+        item = q.get()
+        if item is _FERDIG:
+            return
+        if isinstance(item, Exception):
+            raise item
+        yield item
+
+
+def hent_vegnett_segmentert(
+    segmenter: Iterable[Dict[str, Any]],
+    curs: Dict[str, Any],
+    *,
+    label: str,
+) -> Dict[str, int]:
+    """Skriver segmentert vegnett fra NVDB rett inn i åpne InsertCursorer (VEGNETT_COLS).
+
+    curs: trafikantgruppe → cursor. Hvert segment rutes til cursoren for sin
+    trafikantgruppe, så hver kilde lastes ned én gang for alle gruppene.
+    """
+    cnt = dict.fromkeys(curs, 0)
+    for seg in segmenter:
+        vr = seg.get("vegsystemreferanse") or {}
+        stre = vr.get("strekning") or {}
+        tg = stre.get("trafikantgruppe")
+        cur = curs.get(tg)
+        if cur is None:
+            continue
+
+        geom = to_geometry(seg.get("geometri"))
+        if not geom:
+            continue
+
+        vs = vr.get("vegsystem") or {}
+
+        vegref = None
+        if vs.get("vegkategori") and vs.get("nummer"):
+            vegref = f"{vs['vegkategori']}V{vs['nummer']}"
+            if stre.get("strekning") and stre.get("delstrekning"):
+                vegref += f" S{stre['strekning']}D{stre['delstrekning']}"
+
+        loc = seg.get("lokasjon") or {}
+        kommune_s = str(loc["kommuner"][0]) if loc.get("kommuner") else None
+        fylke_s = str(loc["fylker"][0]) if loc.get("fylker") else None
+
+        cur.insertRow(
+            (
+                geom,
+                int(seg["veglenkesekvensid"]),
+                float(seg.get("startposisjon", 0.0)),
+                float(seg.get("sluttposisjon", 0.0)),
+                tg,
+                vs.get("vegkategori"),
+                vs.get("nummer"),
+                vegref,
+                kommune_s,
+                fylke_s,
             )
-            cnt += 1
+        )
+        cnt[tg] += 1
 
-    log(f"✓ {out_name}: {cnt} segmenter")
-    return fc
+    log(f"✓ {label}: " + ", ".join(f"{tg}={n}" for tg, n in cnt.items()) + " segmenter")
+    return cnt
 
 
 # -------------------------
@@ -425,51 +542,34 @@ def lag_regnett_med_median(gdb: str, in_fc: str, out_name: str) -> str:
     # Sørg for lengde på segmenter
     beregn_lengde_km(in_fc)
 
-    # Key for grouping
-    calc_key_diss(in_fc)
-
-    # Median-tabell pr KEY_DISS
-    stats_tbl = os.path.join(gdb, f"tbl_median_{out_name}")
-    if arcpy.Exists(stats_tbl):
-        arcpy.management.Delete(stats_tbl)
-
-    arcpy.analysis.Statistics(
-        in_table=in_fc,
-        out_table=stats_tbl,
-        statistics_fields=[["Lengde_km", "MEDIAN"]],
-        case_field=["KEY_DISS"],
-    )
+    # Median pr nøkkel (i minnet, erstatter Statistics + JoinField)
+    medianer = median_lengde_pr_nokkel(in_fc)
 
     # Dissolve geometri
     if arcpy.Exists(out_fc):
         arcpy.management.Delete(out_fc)
 
-    dissolve_fields = ["TRAFIKANTGRP", "VEGKATEGORI", "VEGNUMMER", "Driftskontrakt", "KEY_DISS"]
     arcpy.management.Dissolve(
         in_features=in_fc,
         out_feature_class=out_fc,
-        dissolve_field=dissolve_fields,
+        dissolve_field=DISSOLVE_FIELDS,
         statistics_fields=None,
         multi_part="MULTI_PART",
         unsplit_lines="DISSOLVE_LINES",
     )
 
-    # Legg på felt + join median
-    fields_tbl = {f.name for f in arcpy.ListFields(stats_tbl)}
-    median_field = "MEDIAN_Lengde_km" if "MEDIAN_Lengde_km" in fields_tbl else None
-    if not median_field:
-        raise RuntimeError(f"Fant ikke median-felt i {stats_tbl}. Felter: {sorted(fields_tbl)}")
-
+    # Legg på median
     fields_out = {f.name for f in arcpy.ListFields(out_fc)}
     if "Lengde_km_median" not in fields_out:
         arcpy.management.AddField(out_fc, "Lengde_km_median", "DOUBLE")
 
-    arcpy.management.JoinField(out_fc, "KEY_DISS", stats_tbl, "KEY_DISS", [median_field])
-    arcpy.management.CalculateField(out_fc, "Lengde_km_median", f"!{median_field}!", "PYTHON3")
+    with arcpy.da.UpdateCursor(out_fc, DISSOLVE_FIELDS + ["Lengde_km_median"]) as cur:
+        for *key, _ in cur:
+            cur.updateRow((*key, medianer.get(tuple(key))))
 
     # Kjøreloggfelter + domain + init status
     legg_til_kjoreloggfelter(out_fc)
-    setup_domain(gdb)
+    setup_domain(gdb, out_fc)
     init_status_ikke_malt(out_fc)
 
     return out_fc
@@ -480,55 +580,49 @@ def lag_regnett_med_median(gdb: str, in_fc: str, out_name: str) -> str:
 # -------------------------
 def main() -> None:
     log("🚀 Kjørelogg 2026 – bygger FV vegnett + registreringsnett (median)")
+    if ijson is not None:
+        log("NVDB-sider strømmes med ijson (yajl2_c)")
+    else:
+        log(f"NVDB-sider leses med r.json() (ijson-backend: {IJSON_BACKEND or 'ikke installert'})")
 
     os.makedirs(OUT_FOLDER, exist_ok=True)
     create_gdb(OUT_GDB)
     arcpy.env.workspace = OUT_GDB
 
-    session = create_session()
+    # Start nedlastingen med en gang; den går i bakgrunnen mens driftskontrakt importeres
+    mr_ko, vl_ko = last_ned_i_bakgrunn(
+        [
+            ("MR", vegnett_params(MR_FYLKE, VEGSYSTEMREF_MR)),
+            ("VL61", vegnett_params(VL_FYLKE, VEGSYSTEMREF_VL, kommune=VL_KOMM)),
+        ]
+    )
 
     # Import driftskontrakt
     drift_fc = importer_driftskontrakt(OUT_GDB)
     log("✓ Driftskontrakt importert")
 
-    for tg in ("K", "G"):
-        log(f"\n=== Trafikantgruppe {tg} ===")
-
+    # Detalj: MR og Vestland FV61 skrives rett inn i Vegnett_FV_K / _G (ingen tmp-lag + Merge).
+    # Hver kilde pages én gang; segmentene fordeles på K og G etter trafikantgruppe
+    base_fcs = {tg: opprett_vegnett_fc(OUT_GDB, f"Vegnett_FV_{tg}") for tg in ("K", "G")}
+    with arcpy.da.InsertCursor(base_fcs["K"], VEGNETT_COLS) as cur_k, \
+         arcpy.da.InsertCursor(base_fcs["G"], VEGNETT_COLS) as cur_g:
+        curs = {"K": cur_k, "G": cur_g}
         # MR
-        mr_fc = hent_vegnett_segmentert(
-            session,
-            OUT_GDB,
-            out_name=f"tmp_MR_{tg}",
-            fylke=MR_FYLKE,
-            vegsystemref=VEGSYSTEMREF_MR,
-            trafikantgruppe=tg,
-        )
+        hent_vegnett_segmentert(fra_ko(mr_ko), curs, label="MR")
 
         # Vestland FV61 (Stad)
-        vl_fc = hent_vegnett_segmentert(
-            session,
-            OUT_GDB,
-            out_name=f"tmp_VL61_{tg}",
-            fylke=VL_FYLKE,
-            kommune=VL_KOMM,
-            vegsystemref=VEGSYSTEMREF_VL,
-            trafikantgruppe=tg,
-        )
+        hent_vegnett_segmentert(fra_ko(vl_ko), curs, label="VL61")
 
-        # Merge detalj
-        base_fc = os.path.join(OUT_GDB, f"Vegnett_FV_{tg}")
-        if arcpy.Exists(base_fc):
-            arcpy.management.Delete(base_fc)
-        arcpy.management.Merge([mr_fc, vl_fc], base_fc)
-        arcpy.management.Delete(mr_fc)
-        arcpy.management.Delete(vl_fc)
+    for tg, base_fc in base_fcs.items():
+        log(f"\n=== Trafikantgruppe {tg} ===")
+        arcpy.management.AddSpatialIndex(base_fc)
 
-        # Felter + domain
+        # Felter
         legg_til_kjoreloggfelter(base_fc)
-        setup_domain(OUT_GDB)
 
-        # Join driftskontrakt + beregn + init status
+        # Join driftskontrakt + domain + beregn + init status
         base_fc = spatial_join_driftskontrakt(base_fc, drift_fc)
+        setup_domain(OUT_GDB, base_fc)
         calc_driftskontrakt(base_fc)
         beregn_lengde_km(base_fc)
         init_status_ikke_malt(base_fc)
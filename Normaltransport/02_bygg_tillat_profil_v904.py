@@ -32,7 +32,16 @@ Endringer:
 
 from __future__ import annotations
 import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
 import arcpy
+import numpy as np
+
+from profil_common import (
+    check_fields, ensure_fields, field_set, glem_felt, les_felt, require_fc, skriv_rader,
+)
+from profil_intervall import reduser_bolk, til_soa
 
 arcpy.env.overwriteOutput = True
 
@@ -45,195 +54,197 @@ FC_BK      = os.path.join(GDB, "Bruksklasse_904")
 FC_BRU     = os.path.join(GDB, "Bruer")
 FC_HOY     = os.path.join(GDB, "Hoydebegrensning_591")
 OUT_FC     = os.path.join(GDB, "Veg_TillatProfil")
+OUT_FC_TMP = os.path.join("memory", "Veg_TillatProfil")   # fylles i RAM, kopieres til GDB til slutt
 
 ID_FIELD       = "VEGLENKESEKV_ID"
 S0             = "STARTPOS"
 S1             = "SLUTTPOS"
 STRICT_OVERLAP = True   # brukes for bru og høyde
-EPS            = 1e-9
+N_WORKERS      = max(1, (os.cpu_count() or 2) - 1)   # 1 = kjør overlapp-reduksjonen serielt
+MIN_JOBBER_POOL = 200_000   # under dette går det serielt (30k lenker ≈ 2–3 s); spawn-workerne starter tregere
 
 
 # ------------------------------
 # HJELPEFUNKSJONER
 # ------------------------------
-def overlap(a0, a1, b0, b1, strict=True):
-    left  = max(a0, b0)
-    right = min(a1, b1)
-    if strict:
-        return left < right - EPS
-    return left <= right + EPS
-
-
-def min_or_none(vals):
-    v = [x for x in vals if x is not None]
-    return min(v) if v else None
-
-
-def ensure_field(fc, name, ftype, length=None):
-    existing = {f.name for f in arcpy.ListFields(fc)}
-    if name in existing:
-        return
-    if length is None:
-        arcpy.management.AddField(fc, name, ftype)
-    else:
-        arcpy.management.AddField(fc, name, ftype, field_length=length)
-
-
-def require_fc(path):
-    if not arcpy.Exists(path):
-        raise RuntimeError(f"Mangler feature class: {path}")
-
-
-# ------------------------------
-# VALIDÉR INPUT
-# ------------------------------
-for p in [FC_VEGNETT, FC_BK, FC_BRU, FC_HOY]:
-    require_fc(p)
-
-
-def check_fields(fc, needed):
-    fields  = {f.name for f in arcpy.ListFields(fc)}
-    missing = [n for n in needed if n not in fields]
-    if missing:
-        raise RuntimeError(f"{os.path.basename(fc)} mangler felt: {missing}")
+def reduser_alle(jobber, n_workers):
+    """Kjører reduser_vid for alle vid-er, fordelt på en prosesspool når n_workers > 1.
+
+    Vid-ene er uavhengige; bare NumPy-arrays sendes til workerne (geometri blir i hovedprosessen).
+    Poolen brukes bare fra MIN_JOBBER_POOL vid-er; under det er seriell kjøring raskest.
+    """
+    if n_workers <= 1 or len(jobber) < MIN_JOBBER_POOL:
+        return reduser_bolk(STRICT_OVERLAP, jobber)
+    str_bolk = max(1, len(jobber) // (n_workers * 4))
+    bolker   = [jobber[i:i + str_bolk] for i in range(0, len(jobber), str_bolk)]
+    with ProcessPoolExecutor(max_workers=n_workers) as ex:
+        return [
+            res
+            for bolk_res in ex.map(partial(reduser_bolk, STRICT_OVERLAP), bolker)
+            for res in bolk_res
+        ]
 
 
-check_fields(FC_VEGNETT, [ID_FIELD, S0, S1])
-check_fields(FC_BK,  [ID_FIELD, S0, S1, "BK_VERDI", "BK_TEKST", "MAKS_LENGDE"])
-check_fields(FC_BRU, [ID_FIELD, S0, S1, "TILLATT_TONN"])
-check_fields(FC_HOY, [ID_FIELD, S0, S1, "SKILTET_HOYDE"])
-
-# ER_SPES er valgfritt (finnes kun om nvdb_to_gdb er oppdatert)
-bk_fields_in = {f.name for f in arcpy.ListFields(FC_BK)}
-has_er_spes  = "ER_SPES" in bk_fields_in
-
 # ------------------------------
-# BYGG OPPSLAG (per VEGLENKESEKV_ID)
+# KJØRING
 # ------------------------------
-arcpy.AddMessage("Bygger oppslag (BK 904 / Bru / Høyde) per VEGLENKESEKV_ID...")
-
-# idx_bk: vid -> list[(s0, s1, bk_val, bk_text, maks_len, er_spes)]
-idx_bk = {}
-bk_read = [ID_FIELD, S0, S1, "BK_VERDI", "BK_TEKST", "MAKS_LENGDE"]
-if has_er_spes:
-    bk_read.append("ER_SPES")
-
-with arcpy.da.SearchCursor(FC_BK, bk_read) as cur:
-    for row in cur:
+def main():
+    # ------------------------------
+    # VALIDÉR INPUT
+    # ------------------------------
+    for p in [FC_VEGNETT, FC_BK, FC_BRU, FC_HOY]:
+        require_fc(p)
+
+    check_fields(FC_VEGNETT, [ID_FIELD, S0, S1])
+    check_fields(FC_BK,  [ID_FIELD, S0, S1, "BK_VERDI", "BK_TEKST", "MAKS_LENGDE"])
+    check_fields(FC_BRU, [ID_FIELD, S0, S1, "TILLATT_TONN"])
+    check_fields(FC_HOY, [ID_FIELD, S0, S1, "SKILTET_HOYDE"])
+
+    # ER_SPES er valgfritt (finnes kun om nvdb_to_gdb er oppdatert)
+    has_er_spes = "ER_SPES" in field_set(FC_BK)
+
+    # ------------------------------
+    # BYGG OPPSLAG (per VEGLENKESEKV_ID)
+    # ------------------------------
+    arcpy.AddMessage("Bygger oppslag (BK 904 / Bru / Høyde) per VEGLENKESEKV_ID...")
+
+    # Flate rader (vid, s0, s1, *verdier) → én sammenhengende array pr kolonne i til_soa
+    bk_read = [ID_FIELD, S0, S1, "BK_VERDI", "BK_TEKST", "MAKS_LENGDE"]
+    if has_er_spes:
+        bk_read.append("ER_SPES")
+
+    # BK_TEKST som heltallskode (0 = tom); strengen slås opp igjen først ved skriving
+    txt_koder    = {}
+    kode_til_txt = [None]
+    rader_bk = []
+    for row in les_felt(FC_BK, bk_read):
         vid, a0, a1, bk, txt, ml = row[0], row[1], row[2], row[3], row[4], row[5]
         er_spes = row[6] if has_er_spes else "NEI"
         if vid is None:
             continue
-        idx_bk.setdefault(int(vid), []).append(
-            (float(a0 or 0), float(a1 or 0), bk, txt, ml, er_spes)
-        )
-
-idx_bru = {}
-with arcpy.da.SearchCursor(FC_BRU, [ID_FIELD, S0, S1, "TILLATT_TONN"]) as cur:
-    for vid, a0, a1, tonn in cur:
+        kode = 0
+        if txt:
+            kode = txt_koder.get(txt)
+            if kode is None:
+                kode = txt_koder[txt] = len(kode_til_txt)
+                kode_til_txt.append(txt)
+        rader_bk.append((int(vid), float(a0 or 0), float(a1 or 0), bk, kode, ml, er_spes == "JA"))
+
+    rader_bru = [
+        (int(vid), float(a0 or 0), float(a1 or 0), tonn)
+        for vid, a0, a1, tonn in les_felt(FC_BRU, [ID_FIELD, S0, S1, "TILLATT_TONN"])
+        if vid is not None
+    ]
+    rader_hoy = [
+        (int(vid), float(a0 or 0), float(a1 or 0), h)
+        for vid, a0, a1, h in les_felt(FC_HOY, [ID_FIELD, S0, S1, "SKILTET_HOYDE"])
+        if vid is not None
+    ]
+
+    # SoA (NumPy) per vid, sortert på s0 → searchsorted-avgrensede treff + vektorisert min
+    idx_bk  = til_soa(rader_bk,  [("bk", float), ("txt", np.int32), ("maks_len", float), ("er_spes", bool)])
+    for d in idx_bk.values():
+        d["har_spes"] = bool(d["er_spes"].any())   # én gang pr vid, ikke pr segment
+    idx_bru = til_soa(rader_bru, [("tonn", float)])
+    idx_hoy = til_soa(rader_hoy, [("hoyde", float)])
+    del rader_bk, rader_bru, rader_hoy
+
+    arcpy.AddMessage(
+        f"BK-lenker: {len(idx_bk)}, Bru-lenker: {len(idx_bru)}, Høyde-lenker: {len(idx_hoy)}"
+    )
+
+    # ------------------------------
+    # OPPRETT OUTPUT
+    # ------------------------------
+    arcpy.AddMessage("Oppretter Veg_TillatProfil...")
+
+    if arcpy.Exists(OUT_FC_TMP):
+        arcpy.management.Delete(OUT_FC_TMP)
+
+    arcpy.management.CreateFeatureclass(
+        out_path=os.path.dirname(OUT_FC_TMP),
+        out_name=os.path.basename(OUT_FC_TMP),
+        geometry_type="POLYLINE",
+        spatial_reference=FC_VEGNETT,
+    )
+    glem_felt(OUT_FC_TMP)
+
+    ensure_fields(OUT_FC_TMP, [
+        (ID_FIELD,       "LONG",   None),
+        (S0,             "DOUBLE", None),
+        (S1,             "DOUBLE", None),
+        ("BK_VERDI",     "LONG",   None),
+        ("BK_TEKST",     "TEXT",   120),
+        ("MAKS_LENGDE",  "DOUBLE", None),
+        ("ER_SPES",      "TEXT",   5),      # ny
+        ("MIN_BRU_TONN", "LONG",   None),
+        ("MIN_HOYDE",    "DOUBLE", None),
+        ("TILLATT_TONN", "LONG",   None),
+        ("REGIME",       "TEXT",   30),
+        ("BK_OBJTYPE",   "LONG",   None),
+    ])
+
+    # ------------------------------
+    # FYLL OUTPUT
+    # ------------------------------
+    out_cols = [
+        "SHAPE@WKB", ID_FIELD, S0, S1,   # WKB inn og ut: ingen arcpy.Geometry pr rad
+        "BK_VERDI", "BK_TEKST", "MAKS_LENGDE", "ER_SPES",
+        "MIN_BRU_TONN", "MIN_HOYDE", "TILLATT_TONN",
+        "REGIME", "BK_OBJTYPE",
+    ]
+
+    veg_cols     = ["OID@", ID_FIELD, S0, S1]   # uten geometri: leses først ved skriving
+    none_len_cnt = 0
+    spes_cnt     = 0
+
+    # Pass 1: samle Vegnett-segmentene per vid (join mot indeksene gjøres samlet pr vid)
+    veg_by_vid = {}
+    for oid, vid, v0, v1 in les_felt(FC_VEGNETT, veg_cols):
         if vid is None:
             continue
-        idx_bru.setdefault(int(vid), []).append(
-            (float(a0 or 0), float(a1 or 0), tonn)
+        veg_by_vid.setdefault(int(vid), []).append((oid, float(v0 or 0.0), float(v1 or 0.0)))
+
+    arcpy.AddMessage(f"Vegnett: {len(veg_by_vid)} lenker")
+
+    # Pass 2: overlapp/min pr vid (parallelt), deretter attributter pr OID i minnet
+    # Vid-er uten treff i noen indeks trenger ingen overlapp-beregning (vanlig for ikke-FV)
+    vids   = [vid for vid in veg_by_vid if vid in idx_bk or vid in idx_bru or vid in idx_hoy]
+    jobber = [
+        (
+            np.array([sg[1] for sg in veg_by_vid[vid]]),
+            np.array([sg[2] for sg in veg_by_vid[vid]]),
+            idx_bk.get(vid), idx_bru.get(vid), idx_hoy.get(vid),
         )
-
-idx_hoy = {}
-with arcpy.da.SearchCursor(FC_HOY, [ID_FIELD, S0, S1, "SKILTET_HOYDE"]) as cur:
-    for vid, a0, a1, h in cur:
-        if vid is None:
+        for vid in vids
+    ]
+    arcpy.AddMessage(f"Beregner overlapp for {len(jobber)} lenker ({N_WORKERS} prosess(er))...")
+    resultater = dict(zip(vids, reduser_alle(jobber, N_WORKERS)))
+
+    rader = {}   # oid -> attributter (uten geometri)
+    for vid, segs in veg_by_vid.items():
+        res = resultater.get(vid)
+        if res is None:
+            for oid, v0, v1 in segs:
+                rader[oid] = (
+                    vid, v0, v1,
+                    None, None, None, "NEI",
+                    None, None, None,
+                    "NORMALTRANSPORT", 904,
+                )
+            none_len_cnt += len(segs)
             continue
-        idx_hoy.setdefault(int(vid), []).append(
-            (float(a0 or 0), float(a1 or 0), h)
-        )
-
-arcpy.AddMessage(
-    f"BK-lenker: {len(idx_bk)}, Bru-lenker: {len(idx_bru)}, Høyde-lenker: {len(idx_hoy)}"
-)
-
-# ------------------------------
-# OPPRETT OUTPUT
-# ------------------------------
-arcpy.AddMessage("Oppretter Veg_TillatProfil...")
-
-if arcpy.Exists(OUT_FC):
-    arcpy.management.Delete(OUT_FC)
 
-arcpy.management.CreateFeatureclass(
-    out_path=os.path.dirname(OUT_FC),
-    out_name=os.path.basename(OUT_FC),
-    geometry_type="POLYLINE",
-    spatial_reference=FC_VEGNETT,
-)
-
-ensure_field(OUT_FC, ID_FIELD,       "LONG")
-ensure_field(OUT_FC, S0,             "DOUBLE")
-ensure_field(OUT_FC, S1,             "DOUBLE")
-ensure_field(OUT_FC, "BK_VERDI",     "LONG")
-ensure_field(OUT_FC, "BK_TEKST",     "TEXT",   length=120)
-ensure_field(OUT_FC, "MAKS_LENGDE",  "DOUBLE")
-ensure_field(OUT_FC, "ER_SPES",      "TEXT",   length=5)   # ny
-ensure_field(OUT_FC, "MIN_BRU_TONN", "LONG")
-ensure_field(OUT_FC, "MIN_HOYDE",    "DOUBLE")
-ensure_field(OUT_FC, "TILLATT_TONN", "LONG")
-ensure_field(OUT_FC, "REGIME",       "TEXT",   length=30)
-ensure_field(OUT_FC, "BK_OBJTYPE",   "LONG")
-
-# ------------------------------
-# FYLL OUTPUT
-# ------------------------------
-out_cols = [
-    "SHAPE@", ID_FIELD, S0, S1,
-    "BK_VERDI", "BK_TEKST", "MAKS_LENGDE", "ER_SPES",
-    "MIN_BRU_TONN", "MIN_HOYDE", "TILLATT_TONN",
-    "REGIME", "BK_OBJTYPE",
-]
-
-veg_cols     = ["SHAPE@", ID_FIELD, S0, S1]
-count        = 0
-none_len_cnt = 0
-spes_cnt     = 0
-
-with arcpy.da.InsertCursor(OUT_FC, out_cols) as icur:
-    with arcpy.da.SearchCursor(FC_VEGNETT, veg_cols) as vcur:
-        for geom, vid, v0, v1 in vcur:
-            if vid is None:
-                continue
-            vid = int(vid)
-            v0  = float(v0 or 0.0)
-            v1  = float(v1 or 0.0)
-
-            # --- BK (904): strict=False for å fange kantberøring ---
-            hits_bk = []
-            for a0, a1, bk_val, bk_txt, maks_len, er_spes in idx_bk.get(vid, []):
-                if overlap(v0, v1, a0, a1, strict=False):
-                    hits_bk.append((bk_val, bk_txt, maks_len, er_spes))
-
-            bk_val   = min_or_none([h[0] for h in hits_bk])
-            bk_txt   = next((h[1] for h in hits_bk if h[1]), None)
-            maks_len = min_or_none([h[2] for h in hits_bk])
-
-            # ER_SPES = "JA" hvis minst ett overlappende segment er Spes
-            er_spes_out = "JA" if any(h[3] == "JA" for h in hits_bk) else "NEI"
+        bk_vals, bk_txts, maks_lens, er_spes_rad, min_brus, min_hs = res
+        for i, (oid, v0, v1) in enumerate(segs):
+            bk_val, maks_len, min_bru = bk_vals[i], maks_lens[i], min_brus[i]
+            er_spes_out = "JA" if er_spes_rad[i] else "NEI"
 
             if maks_len is None:
                 none_len_cnt += 1
             if er_spes_out == "JA":
                 spes_cnt += 1
 
-            # --- Bru: minste tillatte tonn ---
-            hits_bru = []
-            for a0, a1, bru_tonn in idx_bru.get(vid, []):
-                if overlap(v0, v1, a0, a1, strict=STRICT_OVERLAP):
-                    hits_bru.append(bru_tonn)
-            min_bru = min_or_none(hits_bru)
-
-            # --- Høyde: punkt-objekter, tillat touch ---
-            hits_h = []
-            for a0, a1, hoyde in idx_hoy.get(vid, []):
-                if overlap(v0, v1, a0, a1, strict=False):
-                    hits_h.append(hoyde)
-            min_h = min_or_none(hits_h)
-
             # --- TILLATT_TONN = min(bk_val, min_bru) ---
             if bk_val is None and min_bru is None:
                 tillatt = None
@@ -244,19 +255,40 @@ with arcpy.da.InsertCursor(OUT_FC, out_cols) as icur:
             else:
                 tillatt = min(bk_val, min_bru)
 
-            icur.insertRow((
-                geom, vid, v0, v1,
-                bk_val, bk_txt, maks_len, er_spes_out,
-                min_bru, min_h, tillatt,
+            rader[oid] = (
+                vid, v0, v1,
+                bk_val, kode_til_txt[bk_txts[i]], maks_len, er_spes_out,
+                min_bru, min_hs[i], tillatt,
                 "NORMALTRANSPORT", 904,
-            ))
-            count += 1
-
-arcpy.AddMessage(f"✅ Ferdig Veg_TillatProfil: {count} segmenter")
-arcpy.AddMessage(
-    f"   Segmenter uten MAKS_LENGDE : {none_len_cnt}"
-)
-arcpy.AddMessage(
-    f"   Herav Spes (ER_SPES=JA)    : {spes_cnt}  "
-    f"({'MAKS_LENGDE satt fra skiltet-felt' if spes_cnt and none_len_cnt < spes_cnt else 'sjekk om skiltet-felt er registrert i NVDB'})"
-)
+            )
+
+    # Pass 3: geometrien (WKB-bytes) leses først nå og strømmes rett til output (geometri holdes aldri i minnet)
+    def rader_med_geometri():
+        with arcpy.da.SearchCursor(FC_VEGNETT, ["OID@", "SHAPE@WKB"]) as gcur:
+            for oid, geom in gcur:
+                attrs = rader.get(oid)
+                if attrs is not None:
+                    yield (geom,) + attrs
+
+    arcpy.AddMessage(f"Skriver {len(rader)} rader til {os.path.basename(OUT_FC)}...")
+    skriv_rader(OUT_FC_TMP, out_cols, rader_med_geometri())
+    count = len(rader)
+
+    # Én sekvensiell kopi fra RAM til file-GDB i stedet for rad-for-rad-skriving mot disk
+    if arcpy.Exists(OUT_FC):
+        arcpy.management.Delete(OUT_FC)
+    arcpy.management.CopyFeatures(OUT_FC_TMP, OUT_FC)
+    arcpy.management.Delete(OUT_FC_TMP)
+
+    arcpy.AddMessage(f"✅ Ferdig Veg_TillatProfil: {count} segmenter")
+    arcpy.AddMessage(
+        f"   Segmenter uten MAKS_LENGDE : {none_len_cnt}"
+    )
+    arcpy.AddMessage(
+        f"   Herav Spes (ER_SPES=JA)    : {spes_cnt}  "
+        f"({'MAKS_LENGDE satt fra skiltet-felt' if spes_cnt and none_len_cnt < spes_cnt else 'sjekk om skiltet-felt er registrert i NVDB'})"
+    )
+
+
+if __name__ == "__main__":
+    main()
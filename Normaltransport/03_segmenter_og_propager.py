@@ -8,6 +8,8 @@
 import arcpy
 import os
 
+from profil_common import ensure_fields, field_set
+
 arcpy.env.overwriteOutput = True
 
 # --- GDB / FC ---
@@ -30,40 +32,10 @@ F_BRU = "MIN_BRU_TONN"
 F_DIM = "DIM_KILDE"   # "BRU" eller "VEG"
 F_PROP = "PROPAGERT"  # "JA"/"NEI" (segment-output)
 
-# --- Hjælp ---
-def min_or_none(vals):
-    v = [x for x in vals if x is not None]
-    return min(v) if v else None
-
-def ensure_field(fc, name, ftype, length=None):
-    existing = {f.name for f in arcpy.ListFields(fc)}
-    if name not in existing:
-        if length is None:
-            arcpy.management.AddField(fc, name, ftype)
-        else:
-            arcpy.management.AddField(fc, name, ftype, field_length=length)
-
-def dims_kilde_for_segment(bk, bru):
-    """
-    Returnerer "BRU" hvis bru er dimensjonerende (bru < bk, eller bru == bk),
-    ellers "VEG" hvis veg er dimensjonerende.
-    Hvis bare én finnes: bruk den.
-    """
-    if bk is None and bru is None:
-        return None
-    if bk is None and bru is not None:
-        return "BRU"
-    if bru is None and bk is not None:
-        return "VEG"
-    # begge finnes:
-    if bru <= bk:
-        return "BRU"
-    return "VEG"
-
 print("Leser stats per veglenke (minverdier + dim-kilde)...")
 
 # Sjekk felt
-fields_in = {f.name for f in arcpy.ListFields(IN_FC)}
+fields_in = field_set(IN_FC)
 missing = [f for f in [ID_FIELD, F_TONN, F_BK, F_BRU] if f not in fields_in]
 if missing:
     raise RuntimeError(f"Mangler felt i {IN_FC}: {missing}")
@@ -90,27 +62,26 @@ with arcpy.da.SearchCursor(IN_FC, read_fields) as cur:
         idx += 1 if has_len else 0
         hoyde = row[idx] if has_hoy else None
 
-        if vid not in stats:
-            stats[vid] = {
+        s = stats.get(vid)
+        if s is None:
+            s = stats[vid] = {
                 "tonn": None,
                 "len": None,
                 "hoy": None,
                 "has_bru_dim": False,
-                "has_any": False,
+                "has_any": True,
             }
 
-        s = stats[vid]
-        s["has_any"] = True
+        # Løpende min med None-filter i samme sammenligning (ingen min()-kall pr rad)
+        if tonn is not None and (s["tonn"] is None or tonn < s["tonn"]):
+            s["tonn"] = tonn
+        if lengde is not None and (s["len"] is None or lengde < s["len"]):
+            s["len"] = lengde
+        if hoyde is not None and (s["hoy"] is None or hoyde < s["hoy"]):
+            s["hoy"] = hoyde
 
-        if tonn is not None:
-            s["tonn"] = tonn if s["tonn"] is None else min(s["tonn"], tonn)
-        if lengde is not None:
-            s["len"] = lengde if s["len"] is None else min(s["len"], lengde)
-        if hoyde is not None:
-            s["hoy"] = hoyde if s["hoy"] is None else min(s["hoy"], hoyde)
-
-        seg_dim = dims_kilde_for_segment(bk, bru)
-        if seg_dim == "BRU":
+        # Bru er dimensjonerende når bru <= bk, eller når bare bru finnes
+        if bru is not None and (bk is None or bru <= bk):
             s["has_bru_dim"] = True
 
 print(f"Fant {len(stats)} veglenker.")
@@ -124,14 +95,14 @@ if arcpy.Exists(OUT_SEG_FC):
 
 arcpy.management.CopyFeatures(IN_FC, OUT_SEG_FC)
 
-# Legg til felt som vi fyller
-ensure_field(OUT_SEG_FC, "TONN_PROP", "LONG")
-if has_len:
-    ensure_field(OUT_SEG_FC, "LEN_PROP", "DOUBLE")
-if has_hoy:
-    ensure_field(OUT_SEG_FC, "HOY_PROP", "DOUBLE")
-ensure_field(OUT_SEG_FC, F_DIM, "TEXT", length=10)
-ensure_field(OUT_SEG_FC, F_PROP, "TEXT", length=10)
+# Legg til felt som vi fyller (ett AddFields-kall)
+ensure_fields(OUT_SEG_FC, [
+    ("TONN_PROP", "LONG", None),
+    *([("LEN_PROP", "DOUBLE", None)] if has_len else []),
+    *([("HOY_PROP", "DOUBLE", None)] if has_hoy else []),
+    (F_DIM,       "TEXT",   10),
+    (F_PROP,      "TEXT",   10),
+])
 
 upd_fields = [ID_FIELD, "TONN_PROP", F_DIM, F_PROP]
 if has_len:
@@ -196,7 +167,7 @@ arcpy.management.Dissolve(
 )
 
 # Legg til DIM_KILDE
-ensure_field(OUT_KORR_FC, F_DIM, "TEXT", length=10)
+ensure_fields(OUT_KORR_FC, [(F_DIM, "TEXT", 10)])
 
 # Oppdater DIM_KILDE basert på dict
 with arcpy.da.UpdateCursor(OUT_KORR_FC, [ID_FIELD, F_DIM]) as ucur:
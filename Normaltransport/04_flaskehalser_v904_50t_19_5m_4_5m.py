@@ -18,6 +18,8 @@ Output: Flaskehalser_BK904_Normal_50t_19_5m_4_5m
 import arcpy
 import os
 
+from profil_common import field_set, require_fc, skriv_rader
+
 arcpy.env.overwriteOutput = True
 
 # ------------------------------
@@ -35,33 +37,42 @@ HOYDE_KRAV    = 4.5    # meter
 
 ID_FIELD = "VEGLENKESEKV_ID"
 
+# Faste deler av BESKRIVELSE — bygges én gang, kun tallet formateres pr rad
+_SUF_VEKT   = f"t < {VEKT_KRAV}t)"
+_SUF_BRU    = f"t < {BRU_TONN_KRAV}t)"
+_SUF_LENGDE = f"m < {LENGDE_KRAV}m)"
+_SUF_HOYDE  = f"m < {HOYDE_KRAV}m)"
+
 # ------------------------------
 # OPPRETT OUTPUT
 # ------------------------------
+require_fc(IN_FC)
 path, name = os.path.split(OUT_FC)
 if arcpy.Exists(OUT_FC):
     arcpy.management.Delete(OUT_FC)
 sr = arcpy.Describe(IN_FC).spatialReference
 arcpy.management.CreateFeatureclass(path, name, "POLYLINE", spatial_reference=sr)
 
-
-arcpy.management.AddField(OUT_FC, ID_FIELD,           "LONG")
-arcpy.management.AddField(OUT_FC, "STARTPOS",         "DOUBLE")
-arcpy.management.AddField(OUT_FC, "SLUTTPOS",         "DOUBLE")
-arcpy.management.AddField(OUT_FC, "TILLATT_TONN",     "DOUBLE")
-arcpy.management.AddField(OUT_FC, "MIN_BRU_TONN",     "DOUBLE")   # ny
-arcpy.management.AddField(OUT_FC, "MAKS_LENGDE",      "DOUBLE")
-arcpy.management.AddField(OUT_FC, "FRI_HOYDE",        "DOUBLE")
-arcpy.management.AddField(OUT_FC, "FLASKEHALS",       "TEXT",  field_length=5)
-arcpy.management.AddField(OUT_FC, "BEGRENSNING_TYPE", "TEXT",  field_length=60)
-arcpy.management.AddField(OUT_FC, "BESKRIVELSE",      "TEXT",  field_length=250)
-arcpy.management.AddField(OUT_FC, "REGIME",           "TEXT",  field_length=30)
-arcpy.management.AddField(OUT_FC, "BK_OBJTYPE",       "LONG")
+# Alle felt i ett AddFields-kall (én skjemalås i stedet for tolv)
+arcpy.management.AddFields(OUT_FC, [
+    [ID_FIELD,           "LONG"],
+    ["STARTPOS",         "DOUBLE"],
+    ["SLUTTPOS",         "DOUBLE"],
+    ["TILLATT_TONN",     "DOUBLE"],
+    ["MIN_BRU_TONN",     "DOUBLE"],   # ny
+    ["MAKS_LENGDE",      "DOUBLE"],
+    ["FRI_HOYDE",        "DOUBLE"],
+    ["FLASKEHALS",       "TEXT", "", 5],
+    ["BEGRENSNING_TYPE", "TEXT", "", 60],
+    ["BESKRIVELSE",      "TEXT", "", 250],
+    ["REGIME",           "TEXT", "", 30],
+    ["BK_OBJTYPE",       "LONG"],
+])
 
 # ------------------------------
 # FELTDETEKSJON I INPUT
 # ------------------------------
-in_fields = {f.name for f in arcpy.ListFields(IN_FC)}
+in_fields = field_set(IN_FC)
 
 # Propagerte felt (foretrukket) med fallback til originale felt
 has_tonn_prop = "TONN_PROP"    in in_fields
@@ -82,15 +93,22 @@ USE_HOYDE  = "HOY_PROP"     if has_hoy_prop  else ("MIN_HOYDE"    if has_hoy_ori
 if USE_TONN is None:
     raise RuntimeError("Finner verken TONN_PROP eller TILLATT_TONN i input. Kjør steg 03 først.")
 
-read_fields = ["SHAPE@", ID_FIELD, "STARTPOS", "SLUTTPOS", USE_TONN]
+# Geometri som WKB-bytes inn og ut: kopieres uendret, ingen arcpy.Geometry pr rad
+read_fields = ["SHAPE@WKB", ID_FIELD, "STARTPOS", "SLUTTPOS", USE_TONN]
 if USE_LENGDE:  read_fields.append(USE_LENGDE)
 if USE_HOYDE:   read_fields.append(USE_HOYDE)
 if has_bru:     read_fields.append("MIN_BRU_TONN")
 if has_regime:  read_fields.append("REGIME")
 if has_bkobj:   read_fields.append("BK_OBJTYPE")
 
+# Tallfeltene som testes mot kravene (SQL-filter på cursoren)
+krav = [(USE_TONN, VEKT_KRAV)]
+if has_bru:     krav.append(("MIN_BRU_TONN", BRU_TONN_KRAV))
+if USE_LENGDE:  krav.append((USE_LENGDE, LENGDE_KRAV))
+if USE_HOYDE:   krav.append((USE_HOYDE, HOYDE_KRAV))
+
 cols_out = [
-    "SHAPE@", ID_FIELD, "STARTPOS", "SLUTTPOS",
+    "SHAPE@WKB", ID_FIELD, "STARTPOS", "SLUTTPOS",
     "TILLATT_TONN", "MIN_BRU_TONN", "MAKS_LENGDE", "FRI_HOYDE",
     "FLASKEHALS", "BEGRENSNING_TYPE", "BESKRIVELSE",
     "REGIME", "BK_OBJTYPE",
@@ -102,71 +120,78 @@ print(f"  Lengde-felt: {USE_LENGDE or '(mangler)'}")
 print(f"  Høyde-felt : {USE_HOYDE  or '(mangler)'}")
 print(f"  Bru-felt   : {'MIN_BRU_TONN' if has_bru else '(mangler)'}")
 
+# ------------------------------
+# EVALUER: SQL-filter i geodatabasen, kun kandidater (inkl. geometri) hentes til Python
+# ------------------------------
+# NULL < x er usann i SQL, som tilsvarer "is not None"-sjekkene under
+where = " OR ".join(f"{f} < {grense}" for f, grense in krav)
+print(f"  Filter     : {where}")
+
+rader = []
+
+with arcpy.da.SearchCursor(IN_FC, read_fields, where_clause=where) as scur:
+    for row in scur:
+        geom = row[0]
+        vid  = row[1]
+        s0   = row[2]
+        s1   = row[3]
+        vekt = row[4]   # TONN_PROP eller TILLATT_TONN
+
+        idx = 5
+        lengde  = row[idx] if USE_LENGDE else None
+        idx    += 1 if USE_LENGDE else 0
+
+        hoyde   = row[idx] if USE_HOYDE  else None
+        idx    += 1 if USE_HOYDE  else 0
+
+        min_bru = row[idx] if has_bru    else None
+        idx    += 1 if has_bru    else 0
+
+        regime  = row[idx] if has_regime else "NORMALTRANSPORT"
+        idx    += 1 if has_regime else 0
+
+        bkobj   = row[idx] if has_bkobj  else 904
+
+        # --- EVALUER BEGRENSNINGER ---
+        feil  = []
+        typer = []
+
+        # 1) Vekt < 50 tonn (BK og/eller bru som dimensjonerende)
+        if vekt is not None and float(vekt) < VEKT_KRAV:
+            feil.append("Vekt (" + str(vekt) + _SUF_VEKT)
+            typer.append("Vekt")
+
+        # 2) Bru < 60 tonn (selvstendig begrensning uavhengig av BK)
+        if min_bru is not None and float(min_bru) < BRU_TONN_KRAV:
+            feil.append("Bru (" + str(min_bru) + _SUF_BRU)
+            typer.append("Bru60")
+
+        # 3) Lengde < 19,5 m
+        if lengde is not None and float(lengde) < LENGDE_KRAV:
+            feil.append("Lengde (" + str(lengde) + _SUF_LENGDE)
+            typer.append("Lengde")
+
+        # 4) Høyde < 4,5 m
+        if hoyde is not None and float(hoyde) < HOYDE_KRAV:
+            feil.append("Høyde (" + str(hoyde) + _SUF_HOYDE)
+            typer.append("Høyde")
+
+        if not feil:
+            continue
+
+        begr_type  = " og ".join(typer)
+        beskrivelse = ", ".join(feil)
+
+        rader.append((
+            geom, vid, s0, s1,
+            vekt, min_bru, lengde, hoyde,
+            "JA", begr_type, beskrivelse,
+            regime, bkobj,
+        ))
+
 # ------------------------------
 # FYLL OUTPUT
 # ------------------------------
-count = 0
-
-with arcpy.da.InsertCursor(OUT_FC, cols_out) as icur:
-    with arcpy.da.SearchCursor(IN_FC, read_fields) as scur:
-        for row in scur:
-            geom = row[0]
-            vid  = row[1]
-            s0   = row[2]
-            s1   = row[3]
-            vekt = row[4]   # TONN_PROP eller TILLATT_TONN
-
-            idx = 5
-            lengde  = row[idx] if USE_LENGDE else None
-            idx    += 1 if USE_LENGDE else 0
-
-            hoyde   = row[idx] if USE_HOYDE  else None
-            idx    += 1 if USE_HOYDE  else 0
-
-            min_bru = row[idx] if has_bru    else None
-            idx    += 1 if has_bru    else 0
-
-            regime  = row[idx] if has_regime else "NORMALTRANSPORT"
-            idx    += 1 if has_regime else 0
-
-            bkobj   = row[idx] if has_bkobj  else 904
-
-            # --- EVALUER BEGRENSNINGER ---
-            feil  = []
-            typer = []
-
-            # 1) Vekt < 50 tonn (BK og/eller bru som dimensjonerende)
-            if vekt is not None and float(vekt) < VEKT_KRAV:
-                feil.append(f"Vekt ({vekt}t < {VEKT_KRAV}t)")
-                typer.append("Vekt")
-
-            # 2) Bru < 60 tonn (selvstendig begrensning uavhengig av BK)
-            if min_bru is not None and float(min_bru) < BRU_TONN_KRAV:
-                feil.append(f"Bru ({min_bru}t < {BRU_TONN_KRAV}t)")
-                typer.append("Bru60")
-
-            # 3) Lengde < 19,5 m
-            if lengde is not None and float(lengde) < LENGDE_KRAV:
-                feil.append(f"Lengde ({lengde}m < {LENGDE_KRAV}m)")
-                typer.append("Lengde")
-
-            # 4) Høyde < 4,5 m
-            if hoyde is not None and float(hoyde) < HOYDE_KRAV:
-                feil.append(f"Høyde ({hoyde}m < {HOYDE_KRAV}m)")
-                typer.append("Høyde")
-
-            if not feil:
-                continue
-
-            begr_type  = " og ".join(typer)
-            beskrivelse = ", ".join(feil)
-
-            icur.insertRow((
-                geom, vid, s0, s1,
-                vekt, min_bru, lengde, hoyde,
-                "JA", begr_type, beskrivelse,
-                regime, bkobj,
-            ))
-            count += 1
-
-print(f"✅ Ferdig! Fant {count} flaskehals-segmenter.")
+skriv_rader(OUT_FC, cols_out, rader)
+
+print(f"✅ Ferdig! Fant {len(rader)} flaskehals-segmenter.")
@@ -20,6 +20,18 @@ Fallback til Veg_TillatProfil hvis Veg_TillatSegmentert ikke finnes.
 
 import arcpy
 import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+
+from profil_common import ensure_fields, field_set
+from profil_intervall import til_soa
+
+try:
+    from numba import njit   # valgfri: kompilert overlapp+min+årsak-kjerne
+except ImportError:
+    njit = None
 
 arcpy.env.overwriteOutput = True
 
@@ -34,14 +46,6 @@ ID_FIELD  = "VEGLENKESEKV_ID"
 # Foretrekk propagert; fallback til råprofil
 _SEG  = os.path.join(GDB, "Veg_TillatSegmentert")
 _PROF = os.path.join(GDB, "Veg_TillatProfil")
-if arcpy.Exists(_SEG):
-    PROFIL_FC = _SEG
-    print("Leser fra: Veg_TillatSegmentert (propagerte verdier) ✅")
-elif arcpy.Exists(_PROF):
-    PROFIL_FC = _PROF
-    print("⚠️  Veg_TillatSegmentert mangler — leser fra Veg_TillatProfil (ikke-propagert).")
-else:
-    raise FileNotFoundError(f"Verken Veg_TillatSegmentert eller Veg_TillatProfil finnes i {GDB}.")
 
 # --- KRAV ---
 VEKT_KRAV     = 50.0
@@ -50,41 +54,60 @@ LENGDE_KRAV   = 19.5
 HOYDE_KRAV    = 4.5
 EPS           = 1e-9
 STRICT_OVERLAP = True
+MEMO_DESIMALER = 6      # s0/s1 avrundes slik før memo-oppslag (fanger nesten-like rader)
+LANG_BUCKET    = 4      # veglenker med flere profilsegmenter får også nedre grense (maks_s1)
+N_WORKERS      = max(1, (os.cpu_count() or 2) - 1)   # 1 = klassifiser serielt
+MIN_JOBBER_POOL = 50_000   # under dette går det serielt – hver spawn-worker importerer arcpy på nytt (sekunder)
+
+# Årsak som bitmaske i kjernen; AARSAK_LUT gir teksten (tagger i rekkefølgen under)
+T_BRU, T_VEG, T_LENGDE, T_HOYDE, T_BRU60 = 1, 2, 4, 8, 16
+_TAGS = [("BRU", T_BRU), ("VEG", T_VEG), ("BRU60", T_BRU60), ("LENGDE", T_LENGDE), ("HØYDE", T_HOYDE)]
+AARSAK_LUT = [
+    ", ".join(navn for navn, bit in _TAGS if maske & bit) or "OK" for maske in range(32)
+]
 
 
 # ------------------------------
 # HJELPEFUNKSJONER
 # ------------------------------
-def overlap(a0, a1, b0, b1, strict=True):
-    left  = max(a0, b0)
-    right = min(a1, b1)
-    return (left < right - EPS) if strict else (left <= right + EPS)
-
-
-def min_or_none(values):
-    vals = [v for v in values if v is not None]
-    return min(vals) if vals else None
-
-
-def ensure_fields(fc, fields):
-    existing = {f.name for f in arcpy.ListFields(fc)}
-    for fname, ftype, flen in fields:
-        if fname not in existing:
-            if flen is None:
-                arcpy.management.AddField(fc, fname, ftype)
-            else:
-                arcpy.management.AddField(fc, fname, ftype, field_length=flen)
-
-
-# ------------------------------
-# KOPIER FLASKEHALSER TIL OUTPUT
-# ------------------------------
-print("Kopierer flaskehalser til nytt lag...")
-if arcpy.Exists(OUT_FC):
-    arcpy.management.Delete(OUT_FC)
-arcpy.management.CopyFeatures(FLASKE_FC, OUT_FC)
-
-ensure_fields(OUT_FC, [
+def inf_til_none(x):
+    return None if x == np.inf else float(x)
+
+
+def _dominerer(a, b):
+    """a gir minst like lav min som b: b er None, eller a <= b."""
+    return b is None or (a is not None and a <= b)
+
+
+def komprimer_profil(rader):
+    """Slår sammen/fjerner profilsegmenter som ikke kan endre resultatet (sortert på (vid, s0)).
+
+    rader: [(vid, s0, s1, tonn, bk, bru, lng, hoy, dim_er_bru), ...]
+      - tilstøtende/overlappende segmenter med like verdier slås sammen til ett
+      - segment helt innenfor forrige, med verdier >= forriges (og ikke BRU der forrige
+        ikke er det), droppes – alt som treffer det treffer også forrige
+    """
+    rader.sort(key=lambda r: (r[0], r[1]))
+    ut = []
+    for r in rader:
+        if ut and ut[-1][0] == r[0]:
+            p = ut[-1]
+            if p[3:] == r[3:] and r[1] - p[2] < EPS:
+                if r[2] > p[2]:
+                    ut[-1] = p[:2] + (r[2],) + p[3:]
+                continue
+            if (
+                r[2] <= p[2]
+                and (p[8] or not r[8])
+                and all(_dominerer(a, b) for a, b in zip(p[3:8], r[3:8]))
+            ):
+                continue
+        ut.append(r)
+    return ut
+
+
+# Rekkefølgen følger klassifiser-resultatet
+UT_FELT = [
     ("AARSAK_DETALJERT",  "TEXT",   100),
     ("TONN_PROP_VERDI",   "LONG",   None),   # propagert dimensjonerende tonn
     ("VEG_BK_VERDI",      "LONG",   None),   # BK-verdi fra vegnettet
@@ -92,152 +115,325 @@ ensure_fields(OUT_FC, [
     ("MAKS_LENGDE_VERDI", "DOUBLE", None),   # propagert min lengde
     ("FRI_HOYDE_VERDI",   "DOUBLE", None),   # propagert min høyde
     ("DIM_KILDE",         "TEXT",   10),     # BRU / VEG
-])
-
-
-# ------------------------------
-# FELTDETEKSJON I PROFIL/SEGMENTERT
-# ------------------------------
-pfields = {f.name for f in arcpy.ListFields(PROFIL_FC)}
-
-# Propagerte felt foretrekkes, fallback til råfelt
-P_TONN = "TONN_PROP"    if "TONN_PROP"    in pfields else "TILLATT_TONN"
-P_BK   = "BK_VERDI"     if "BK_VERDI"     in pfields else None
-P_BRU  = "MIN_BRU_TONN" if "MIN_BRU_TONN" in pfields else None
-P_LEN  = "LEN_PROP"     if "LEN_PROP"     in pfields else ("MAKS_LENGDE" if "MAKS_LENGDE" in pfields else None)
-P_HOY  = "HOY_PROP"     if "HOY_PROP"     in pfields else ("MIN_HOYDE"   if "MIN_HOYDE"   in pfields else None)
-P_DIM  = "DIM_KILDE"    if "DIM_KILDE"    in pfields else None
-
-print(f"  Tonn-felt  : {P_TONN}")
-print(f"  BK-felt    : {P_BK or '(mangler)'}")
-print(f"  Bru-felt   : {P_BRU or '(mangler)'}")
-print(f"  Lengde-felt: {P_LEN or '(mangler)'}")
-print(f"  Høyde-felt : {P_HOY or '(mangler)'}")
-print(f"  DIM_KILDE  : {P_DIM or '(mangler — beregnes fra BK+BRU)'}")
+]
 
 
 # ------------------------------
-# BYGG OPPSLAG FRA PROFIL/SEGMENTERT
+# KLASSIFISERING PR FLASKEHALS
 # ------------------------------
-print(f"Bygger oppslag per {ID_FIELD} fra {os.path.basename(PROFIL_FC)}...")
-
-idx = {}   # vid → list[(s0, s1, tonn, bk, bru, lng, hoy, dim)]
-
-read = [ID_FIELD, "STARTPOS", "SLUTTPOS", P_TONN]
-if P_BK:  read.append(P_BK)
-if P_BRU: read.append(P_BRU)
-if P_LEN: read.append(P_LEN)
-if P_HOY: read.append(P_HOY)
-if P_DIM: read.append(P_DIM)
-
-with arcpy.da.SearchCursor(PROFIL_FC, read) as cur:
-    for row in cur:
-        vls  = int(row[0])
-        s0   = float(row[1] or 0.0)
-        s1   = float(row[2] or 1.0)
-        k    = 3
-        tonn = row[k];                              k += 1
-        bk   = row[k] if P_BK  else None;          k += 1 if P_BK  else 0
-        bru  = row[k] if P_BRU else None;          k += 1 if P_BRU else 0
-        lng  = row[k] if P_LEN else None;          k += 1 if P_LEN else 0
-        hoy  = row[k] if P_HOY else None;          k += 1 if P_HOY else 0
-        dim  = row[k] if P_DIM else None
-        idx.setdefault(vls, []).append((s0, s1, tonn, bk, bru, lng, hoy, dim))
-
-print(f"  Oppslag bygget for {len(idx)} veglenker.")
+def _aarsak(tonn, bk, bru, lng, hoy, har_dim, dim_bru):
+    """Årsak-bitmaske og DIM_KILDE = BRU for min-verdiene til én flaskehals (inf = mangler).
+
+    dim_bru brukes bare med DIM_KILDE-felt (har_dim); ellers avgjøres kilden av BK vs BRU.
+    """
+    if not har_dim:
+        dim_bru = bru < np.inf and bru <= bk
+
+    maske = 0
+
+    # --- Vekt < 50t ---
+    if tonn < VEKT_KRAV:
+        if bru < np.inf and bk == bru:
+            maske |= T_BRU | T_VEG
+        elif dim_bru:
+            maske |= T_BRU
+        else:
+            maske |= T_VEG
+
+    # --- Bru 50–59t: selvstendig begrensning ---
+    if bru < BRU_TONN_KRAV and not maske & T_BRU:
+        maske |= T_BRU60
+
+    # --- Lengde < 19.5m ---
+    if lng < LENGDE_KRAV:
+        maske |= T_LENGDE
+
+    # --- Høyde < 4.5m ---
+    if hoy < HOYDE_KRAV:
+        maske |= T_HOYDE
+
+    return maske, dim_bru
+
+
+def _klassifiser_kjerne(p0, p1, maks_s1, tonn, bk, bru, lng, hoy, dim_bru,
+                        q0, q1, har_dim, ut_min, ut_maske, ut_dim_bru):
+    """Overlapp + min + årsak for alle strekninger (q0, q1) mot én veglenkes profil.
+
+    ut_min (n × 5, fylt med inf) får min tonn/bk/bru/lng/hoy; ut_maske = -1 der ingen
+    profilsegmenter overlapper. NaN hoppes over (NaN < x er usann).
+    """
+    for i in range(len(q0)):
+        s0 = q0[i]
+        s1 = q1[i]
+        stopp = np.searchsorted(p0, s1 + EPS, side="right")
+        start = np.searchsorted(maks_s1, s0 - EPS, side="left") if stopp > LANG_BUCKET else 0
+        treff  = False
+        er_bru = False
+        for j in range(start, stopp):
+            left  = max(p0[j], s0)
+            right = min(p1[j], s1)
+            if STRICT_OVERLAP:
+                if not left < right - EPS:
+                    continue
+            elif not left <= right + EPS:
+                continue
+            treff = True
+            if tonn[j] < ut_min[i, 0]:
+                ut_min[i, 0] = tonn[j]
+            if bk[j] < ut_min[i, 1]:
+                ut_min[i, 1] = bk[j]
+            if bru[j] < ut_min[i, 2]:
+                ut_min[i, 2] = bru[j]
+            if lng[j] < ut_min[i, 3]:
+                ut_min[i, 3] = lng[j]
+            if hoy[j] < ut_min[i, 4]:
+                ut_min[i, 4] = hoy[j]
+            if dim_bru[j]:
+                er_bru = True
+        if not treff:
+            ut_maske[i] = -1
+            continue
+        maske, dim = _aarsak(
+            ut_min[i, 0], ut_min[i, 1], ut_min[i, 2], ut_min[i, 3], ut_min[i, 4],
+            har_dim, er_bru,
+        )
+        ut_maske[i]   = maske
+        ut_dim_bru[i] = dim
+
+
+if njit is not None:
+    _aarsak             = njit(cache=True)(_aarsak)
+    _klassifiser_kjerne = njit(cache=True)(_klassifiser_kjerne)
+
+
+def _resultat(maske, mins, dim_bru):
+    """(aarsak, tonn_prop, bk_val, bru_tonn, maks_len, fri_hoyde, dim_kilde) med None for inf."""
+    return (AARSAK_LUT[maske], *(inf_til_none(x) for x in mins), "BRU" if dim_bru else "VEG")
+
+
+def klassifiser(b, s0, s1, har_dim):
+    """Overlapp + min + årsak for én flaskehals mot profil-SoA b for veglenka (NumPy-variant).
+
+    har_dim: profilen har DIM_KILDE-felt (ellers beregnes kilden fra BK vs BRU).
+    Returnerer (aarsak, tonn_prop, bk_val, bru_tonn, maks_len, fri_hoyde, dim_kilde),
+    eller None hvis ingen profilsegmenter overlapper.
+    """
+    # Bare profilsegmenter med p0 <= s1 + EPS (og p1 >= s0 - EPS) kan overlappe
+    stopp = np.searchsorted(b["s0"], s1 + EPS, side="right")
+    start = np.searchsorted(b["maks_s1"], s0 - EPS, side="left") if stopp > LANG_BUCKET else 0
+    vindu = slice(start, max(start, stopp))
+    left  = np.maximum(b["s0"][vindu], s0)
+    right = np.minimum(b["s1"][vindu], s1)
+    m = (left < right - EPS) if STRICT_OVERLAP else (left <= right + EPS)
+
+    if not m.any():
+        return None
+
+    mins = [
+        float(np.fmin.reduce(b[k][vindu][m], initial=np.inf))
+        for k in ("tonn", "bk", "bru", "lng", "hoy")
+    ]
+    maske, dim_bru = _aarsak(*mins, har_dim, bool(b["dim_bru"][vindu][m].any()))
+    return _resultat(maske, mins, dim_bru)
+
+
+def klassifiser_vls(b, strekk, har_dim):
+    """klassifiser for alle strekk = [(s0, s1), ...] på én veglenke; kompilert kjerne med numba."""
+    if njit is None:
+        return [klassifiser(b, s0, s1, har_dim) for s0, s1 in strekk]
+    n = len(strekk)
+    q = np.array(strekk, dtype=float).reshape(n, 2)
+    ut_min     = np.full((n, 5), np.inf)
+    ut_maske   = np.zeros(n, dtype=np.int64)
+    ut_dim_bru = np.zeros(n, dtype=np.bool_)
+    _klassifiser_kjerne(
+        b["s0"], b["s1"], b["maks_s1"],
+        b["tonn"], b["bk"], b["bru"], b["lng"], b["hoy"], b["dim_bru"],
+        q[:, 0].copy(), q[:, 1].copy(), har_dim, ut_min, ut_maske, ut_dim_bru,
+    )
+    return [
+        None if maske < 0 else _resultat(maske, mins, dim_bru)
+        for maske, mins, dim_bru in zip(ut_maske.tolist(), ut_min.tolist(), ut_dim_bru.tolist())
+    ]
+
+
+def klassifiser_bolk(har_dim, bolk):
+    """Worker-jobb: bolk = [(b, [(s0, s1), ...]), ...] → [[klassifiser(...), ...], ...]."""
+    return [klassifiser_vls(b, strekk, har_dim) for b, strekk in bolk]
+
+
+def klassifiser_alle(jobber, har_dim, n_workers):
+    """Kjører klassifiser for alle jobber (én pr veglenke), fordelt på en prosesspool.
+
+    Veglenkene er uavhengige; hver worker får bare profil-SoA for veglenkene i sin bolk.
+    Poolen brukes bare fra MIN_JOBBER_POOL jobber; færre regnes serielt på millisekunder.
+    """
+    if n_workers <= 1 or len(jobber) < MIN_JOBBER_POOL:
+        return klassifiser_bolk(har_dim, jobber)
+    str_bolk = max(1, len(jobber) // (n_workers * 4))
+    bolker   = [jobber[i:i + str_bolk] for i in range(0, len(jobber), str_bolk)]
+    with ProcessPoolExecutor(max_workers=n_workers) as ex:
+        return [
+            res
+            for bolk_res in ex.map(partial(klassifiser_bolk, har_dim), bolker)
+            for res in bolk_res
+        ]
 
 
 # ------------------------------
-# KLASSIFISER ÅRSAKER
+# KJØRING
 # ------------------------------
-print("Klassifiserer årsaker...")
-
-out_fields = [
-    ID_FIELD, "STARTPOS", "SLUTTPOS",
-    "AARSAK_DETALJERT",
-    "TONN_PROP_VERDI", "VEG_BK_VERDI", "BRU_TONN_VERDI",
-    "MAKS_LENGDE_VERDI", "FRI_HOYDE_VERDI",
-    "DIM_KILDE",
-]
-
-updated = 0
-no_hit  = 0
-ok_cnt  = 0
-
-with arcpy.da.UpdateCursor(OUT_FC, out_fields) as ucur:
-    for row in ucur:
-        vls = int(row[0])
-        s0  = float(row[1] or 0.0)
-        s1  = float(row[2] or 1.0)
-
-        hits = [
-            h for h in idx.get(vls, [])
-            if overlap(s0, s1, h[0], h[1], strict=STRICT_OVERLAP)
-        ]
-
-        if not hits:
+def main():
+    if arcpy.Exists(_SEG):
+        profil_fc = _SEG
+        print("Leser fra: Veg_TillatSegmentert (propagerte verdier) ✅")
+    elif arcpy.Exists(_PROF):
+        profil_fc = _PROF
+        print("⚠️  Veg_TillatSegmentert mangler — leser fra Veg_TillatProfil (ikke-propagert).")
+    else:
+        raise FileNotFoundError(f"Verken Veg_TillatSegmentert eller Veg_TillatProfil finnes i {GDB}.")
+
+    # ------------------------------
+    # KOPIER FLASKEHALSER TIL OUTPUT
+    # ------------------------------
+    print("Kopierer flaskehalser til nytt lag...")
+    if arcpy.Exists(OUT_FC):
+        arcpy.management.Delete(OUT_FC)
+    arcpy.management.CopyFeatures(FLASKE_FC, OUT_FC)
+    ensure_fields(OUT_FC, UT_FELT)
+
+    # ------------------------------
+    # FELTDETEKSJON I PROFIL/SEGMENTERT
+    # ------------------------------
+    pfields = field_set(profil_fc)
+
+    # Propagerte felt foretrekkes, fallback til råfelt
+    P_TONN = "TONN_PROP"    if "TONN_PROP"    in pfields else "TILLATT_TONN"
+    P_BK   = "BK_VERDI"     if "BK_VERDI"     in pfields else None
+    P_BRU  = "MIN_BRU_TONN" if "MIN_BRU_TONN" in pfields else None
+    P_LEN  = "LEN_PROP"     if "LEN_PROP"     in pfields else ("MAKS_LENGDE" if "MAKS_LENGDE" in pfields else None)
+    P_HOY  = "HOY_PROP"     if "HOY_PROP"     in pfields else ("MIN_HOYDE"   if "MIN_HOYDE"   in pfields else None)
+    P_DIM  = "DIM_KILDE"    if "DIM_KILDE"    in pfields else None
+
+    print(f"  Tonn-felt  : {P_TONN}")
+    print(f"  BK-felt    : {P_BK or '(mangler)'}")
+    print(f"  Bru-felt   : {P_BRU or '(mangler)'}")
+    print(f"  Lengde-felt: {P_LEN or '(mangler)'}")
+    print(f"  Høyde-felt : {P_HOY or '(mangler)'}")
+    print(f"  DIM_KILDE  : {P_DIM or '(mangler — beregnes fra BK+BRU)'}")
+
+    # ------------------------------
+    # BYGG OPPSLAG FRA PROFIL/SEGMENTERT
+    # ------------------------------
+    print(f"Bygger oppslag per {ID_FIELD} fra {os.path.basename(profil_fc)}...")
+
+    rader = []   # (vid, s0, s1, tonn, bk, bru, lng, hoy, dim_er_bru)
+
+    read = [ID_FIELD, "STARTPOS", "SLUTTPOS", P_TONN]
+    if P_BK:  read.append(P_BK)
+    if P_BRU: read.append(P_BRU)
+    if P_LEN: read.append(P_LEN)
+    if P_HOY: read.append(P_HOY)
+    if P_DIM: read.append(P_DIM)
+
+    with arcpy.da.SearchCursor(profil_fc, read) as cur:
+        for row in cur:
+            vls  = int(row[0])
+            s0   = float(row[1] or 0.0)
+            s1   = float(row[2] or 1.0)
+            k    = 3
+            tonn = row[k];                              k += 1
+            bk   = row[k] if P_BK  else None;          k += 1 if P_BK  else 0
+            bru  = row[k] if P_BRU else None;          k += 1 if P_BRU else 0
+            lng  = row[k] if P_LEN else None;          k += 1 if P_LEN else 0
+            hoy  = row[k] if P_HOY else None;          k += 1 if P_HOY else 0
+            dim  = row[k] if P_DIM else None
+            rader.append((vls, s0, s1, tonn, bk, bru, lng, hoy, dim == "BRU"))
+
+    antall_for = len(rader)
+    rader = komprimer_profil(rader)
+    print(f"  Profilsegmenter: {antall_for} → {len(rader)} etter sammenslåing av like/dekkede.")
+
+    # Flat SoA: én sammenhengende NumPy-kolonne pr felt sortert på (vid, s0), og pr vid
+    # views inn i disse (None → NaN, maks_s1 = løpende maks av s1 innen vid).
+    # searchsorted avgrenser kandidatene, overlapp og min gjøres vektorisert pr flaskehals
+    idx = til_soa(rader, [
+        ("tonn", float), ("bk", float), ("bru", float),
+        ("lng", float), ("hoy", float), ("dim_bru", bool),
+    ])
+    del rader
+
+    print(f"  Oppslag bygget for {len(idx)} veglenker.")
+
+    # ------------------------------
+    # KLASSIFISER ÅRSAKER
+    # ------------------------------
+    # Flaskehalsene leses én gang som NumPy-array; resultatet skrives tilbake i
+    # ett UpdateCursor-pass over feltene som ble opprettet etter kopieringen
+    flaske = arcpy.da.FeatureClassToNumPyArray(
+        OUT_FC, ["OID@", ID_FIELD, "STARTPOS", "SLUTTPOS"],
+        null_value={ID_FIELD: -1, "STARTPOS": 0.0, "SLUTTPOS": 1.0},
+    )
+    # SLUTTPOS = 0 behandles som NULL (hele lenka); float64-kolonnene brukes direkte
+    flaske["SLUTTPOS"][flaske["SLUTTPOS"] == 0.0] = 1.0
+    s0_liste   = flaske["STARTPOS"].tolist()
+    s1_liste   = flaske["SLUTTPOS"].tolist()
+    rad_nokler = list(zip(   # (vls, s0, s1) avrundet, én gang for alle rader
+        flaske[ID_FIELD].tolist(),
+        np.round(flaske["STARTPOS"], MEMO_DESIMALER).tolist(),
+        np.round(flaske["SLUTTPOS"], MEMO_DESIMALER).tolist(),
+    ))
+
+    # Unike nøkler grupperes pr veglenke; like flaskehalsrader regnes én gang
+    memo    = {}   # nøkkel → klassifiser-resultat (None = ingen treff)
+    pr_vls  = {}   # vls → ([nøkkel, ...], [(s0, s1), ...])
+    for key, s0, s1 in zip(rad_nokler, s0_liste, s1_liste):
+        if key in memo:
+            continue
+        memo[key] = None
+        vls = key[0]
+        if vls in idx:
+            nokler, strekk = pr_vls.setdefault(vls, ([], []))
+            nokler.append(key)
+            strekk.append((s0, s1))
+
+    print(f"Klassifiserer årsaker ({len(memo)} unike strekninger, {N_WORKERS} prosess(er))...")
+    vls_liste = list(pr_vls)
+    jobber    = [(idx[vls], pr_vls[vls][1]) for vls in vls_liste]
+    for vls, resultater in zip(vls_liste, klassifiser_alle(jobber, bool(P_DIM), N_WORKERS)):
+        memo.update(zip(pr_vls[vls][0], resultater))
+
+    resultat = {}   # oid → klassifiser-resultat
+    no_hit   = 0
+    ok_cnt   = 0
+
+    for oid, key in zip(flaske["OID@"].tolist(), rad_nokler):
+        res = memo[key]
+        if res is None:
             no_hit += 1
             continue
 
-        tonn_prop = min_or_none([h[2] for h in hits])
-        bk_val    = min_or_none([h[3] for h in hits])
-        bru_tonn  = min_or_none([h[4] for h in hits])
-        maks_len  = min_or_none([h[5] for h in hits])
-        fri_hoyde = min_or_none([h[6] for h in hits])
-
-        # DIM_KILDE: fra felt hvis tilgjengelig, ellers beregn fra BK vs BRU
-        if P_DIM:
-            dim_kilde = "BRU" if any(h[7] == "BRU" for h in hits) else "VEG"
-        else:
-            if bk_val is not None and bru_tonn is not None:
-                dim_kilde = "BRU" if bru_tonn <= bk_val else "VEG"
-            elif bru_tonn is not None:
-                dim_kilde = "BRU"
-            else:
-                dim_kilde = "VEG"
-
-        tags = []
-
-        # --- Vekt < 50t ---
-        if tonn_prop is not None and float(tonn_prop) < VEKT_KRAV:
-            if bk_val is not None and bru_tonn is not None and bk_val == bru_tonn:
-                tags.extend(["BRU", "VEG"])
-            elif dim_kilde == "BRU":
-                tags.append("BRU")
-            else:
-                tags.append("VEG")
-
-        # --- Bru 50–59t: selvstendig begrensning ---
-        if bru_tonn is not None and float(bru_tonn) < BRU_TONN_KRAV:
-            if "BRU" not in tags:
-                tags.append("BRU60")
-
-        # --- Lengde < 19.5m ---
-        if maks_len is not None and float(maks_len) < LENGDE_KRAV:
-            tags.append("LENGDE")
-
-        # --- Høyde < 4.5m ---
-        if fri_hoyde is not None and float(fri_hoyde) < HOYDE_KRAV:
-            tags.append("HØYDE")
-
-        aarsak = ", ".join(tags) if tags else "OK"
-        if aarsak == "OK":
+        if res[0] == "OK":
             ok_cnt += 1
-
-        ucur.updateRow((
-            vls, s0, s1,
-            aarsak,
-            tonn_prop, bk_val, bru_tonn,
-            maks_len, fri_hoyde,
-            dim_kilde,
-        ))
-        updated += 1
-
-print(f"✅ Ferdig! Oppdaterte {updated} rader.")
-if no_hit:
-    print(f"  ⚠️  {no_hit} rader uten profil-treff (ingen overlapp funnet).")
-if ok_cnt:
-    print(f"  ⚠️  {ok_cnt} rader fikk AARSAK = 'OK' — disse hadde ingen verdi under terskel.")
-    print(f"      Sjekk om TONN_PROP / LEN_PROP er NULL for disse segmentene.")
-else:
-    print(f"  ✅ Ingen 'OK'-rader — alle flaskehalser har klassifisert årsak.")
+        resultat[oid] = res
+
+    updated = 0
+    with arcpy.da.UpdateCursor(OUT_FC, ["OID@"] + [f[0] for f in UT_FELT]) as ucur:
+        for row in ucur:
+            res = resultat.get(row[0])
+            if res is not None:
+                ucur.updateRow((row[0],) + tuple(res))
+                updated += 1
+
+    print(f"✅ Ferdig! Oppdaterte {updated} rader.")
+    if no_hit:
+        print(f"  ⚠️  {no_hit} rader uten profil-treff (ingen overlapp funnet).")
+    if ok_cnt:
+        print(f"  ⚠️  {ok_cnt} rader fikk AARSAK = 'OK' — disse hadde ingen verdi under terskel.")
+        print(f"      Sjekk om TONN_PROP / LEN_PROP er NULL for disse segmentene.")
+    else:
+        print(f"  ✅ Ingen 'OK'-rader — alle flaskehalser har klassifisert årsak.")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,11 @@ import arcpy
 import requests
 import os
 
+try:
+    import orjson   # valgfri: raskere JSON-dekoding av NVDB-sidene
+except ImportError:
+    orjson = None
+
 arcpy.env.overwriteOutput = True
 
 # --- KONFIGURASJON ---
@@ -48,7 +53,7 @@ def hent_alle_objekter():
                 print(f"Feil: {r.status_code}")
                 break
             
-            data = r.json()
+            data = orjson.loads(r.content) if orjson is not None else r.json()
             nye = data.get("objekter", [])
             
             if not nye: break
@@ -1,12 +1,19 @@
 # 07_blindveg_analyse.py
 # Bruker Bruksklasse_904 som vegnett-kilde.
-# Et segment er RØDT hvis det er en "bro" i grafen (nx.bridges),
+# Et segment er RØDT hvis det er en "bro" i grafen (Tarjan på CSR-naboliste),
 # dvs. fjerning av segmentet ville økt antall komponenter → ingen omkjøring.
 # VEGREF og KOMMUNE hentes fra Vegnett via VID-oppslag.
 
 import arcpy
 import os
-import networkx as nx
+import numpy as np
+
+from profil_common import ensure_fields, field_set
+
+try:
+    from numba import njit   # valgfri: kompilert bro-søk over CSR-arrayene
+except ImportError:
+    njit = None
 
 arcpy.env.overwriteOutput = True
 
@@ -19,9 +26,80 @@ OUTFC_UTEN      = os.path.join(GDB, "Vegnett_UtenOmkjoring")
 
 SNAP_DECIMALS = 1
 
-def round_coord(c, decimals=SNAP_DECIMALS):
-    f = 10 ** decimals
-    return (round(c[0] * f) / f, round(c[1] * f) / f)
+_SNAP_F      = 10 ** SNAP_DECIMALS
+_NODE_OFFSET = 1 << 31   # negative koordinater → ikke-negative 32-bit
+
+
+def node_key(x, y):
+    """Snappet (x, y) pakket i én int64: x i høye 32 bit, y i lave (ordning som (x, y)-tuppel)."""
+    return ((round(x * _SNAP_F) + _NODE_OFFSET) << 32) | (round(y * _SNAP_F) + _NODE_OFFSET)
+
+
+def bygg_csr(u, v, n_noder):
+    """Urettet kantliste (u[i], v[i]) → CSR (indptr, nabo, kant_id); begge retninger lagres."""
+    kilde   = np.concatenate([u, v])
+    nabo    = np.concatenate([v, u])
+    kant_id = np.concatenate([np.arange(len(u))] * 2)
+    rekkefolge = np.argsort(kilde, kind="stable")
+    indptr = np.zeros(n_noder + 1, dtype=np.int64)
+    np.cumsum(np.bincount(kilde, minlength=n_noder), out=indptr[1:])
+    return indptr, nabo[rekkefolge], kant_id[rekkefolge]
+
+
+def _broer_kjerne(indptr, nabo, kant_id, n_noder, n_kanter):
+    """Iterativ Tarjan (uten rekursjon): True for kanter som er broer. Løkker er aldri broer."""
+    disc   = np.full(n_noder, -1, dtype=np.int64)
+    low    = np.zeros(n_noder, dtype=np.int64)
+    er_bro = np.zeros(n_kanter, dtype=np.bool_)
+    s_node = np.empty(n_noder, dtype=np.int64)   # DFS-stakk: node,
+    s_kant = np.empty(n_noder, dtype=np.int64)   # kanten vi kom inn via,
+    s_pos  = np.empty(n_noder, dtype=np.int64)   # neste posisjon i nabolisten
+    tid = 0
+    for rot in range(n_noder):
+        if disc[rot] != -1:
+            continue
+        disc[rot] = tid
+        low[rot]  = tid
+        tid += 1
+        topp = 0
+        s_node[0] = rot
+        s_kant[0] = -1
+        s_pos[0]  = indptr[rot]
+        while topp >= 0:
+            x = s_node[topp]
+            p = s_pos[topp]
+            if p < indptr[x + 1]:
+                s_pos[topp] = p + 1
+                w = nabo[p]
+                if kant_id[p] == s_kant[topp]:
+                    continue
+                if disc[w] == -1:
+                    disc[w] = tid
+                    low[w]  = tid
+                    tid += 1
+                    topp += 1
+                    s_node[topp] = w
+                    s_kant[topp] = kant_id[p]
+                    s_pos[topp]  = indptr[w]
+                elif disc[w] < low[x]:
+                    low[x] = disc[w]
+            else:
+                topp -= 1
+                if topp >= 0:
+                    forelder = s_node[topp]
+                    if low[x] < low[forelder]:
+                        low[forelder] = low[x]
+                    if low[x] > disc[forelder]:
+                        er_bro[s_kant[topp + 1]] = True
+    return er_bro
+
+
+if njit is not None:
+    _broer_kjerne = njit(cache=True)(_broer_kjerne)
+
+
+def finn_broer(indptr, nabo, kant_id, n_kanter):
+    return _broer_kjerne(indptr, nabo, kant_id, len(indptr) - 1, n_kanter)
 
 # ----------------------------------------------------------------
 # Steg 1: Hent VEGREF og KOMMUNE fra Vegnett via VID-oppslag
@@ -30,17 +108,32 @@ print("=" * 60)
 print("Steg 1: Henter VEGREF og KOMMUNE fra Vegnett...")
 print("=" * 60)
 
-vid_info = {}  # vid_int -> (vegref, kommune)
-with arcpy.da.SearchCursor(FC_VEGNETT, ["VEGLENKESEKV_ID", "VEGREF", "KOMMUNE"]) as cur:
-    for row in cur:
-        vid = row[0]
-        if vid is None:
-            continue
-        vid_int = int(vid)
-        if vid_int not in vid_info:
-            vid_info[vid_int] = (row[1] or "", row[2] or "")
+# Hele tabellen som NumPy-array; første forekomst pr VID via np.unique (ingen Python-løkke).
+# Oppslaget holdes som tre parallelle arrays sortert på VID (searchsorted, ingen dict)
+arr = arcpy.da.FeatureClassToNumPyArray(
+    FC_VEGNETT, ["VEGLENKESEKV_ID", "VEGREF", "KOMMUNE"],
+    null_value={"VEGLENKESEKV_ID": -1, "VEGREF": "", "KOMMUNE": ""},
+)
+arr = arr[arr["VEGLENKESEKV_ID"] != -1]
+vid_ids, forste = np.unique(arr["VEGLENKESEKV_ID"], return_index=True)
+vid_vegref  = arr["VEGREF"][forste]
+vid_kommune = arr["KOMMUNE"][forste]
+del arr
+
 
-print(f"  VID-oppslag bygget: {len(vid_info)} unike VID-er")
+def vid_oppslag(vider):
+    """VID-array -> (vegref-liste, kommune-liste); "" der VID ikke finnes i Vegnett."""
+    if not len(vid_ids):
+        return [""] * len(vider), [""] * len(vider)
+    pos    = np.minimum(np.searchsorted(vid_ids, vider), len(vid_ids) - 1)
+    funnet = vid_ids[pos] == vider
+    return (
+        np.where(funnet, vid_vegref[pos], "").tolist(),
+        np.where(funnet, vid_kommune[pos], "").tolist(),
+    )
+
+
+print(f"  VID-oppslag bygget: {len(vid_ids)} unike VID-er")
 
 # ----------------------------------------------------------------
 # Steg 2: Les Bruksklasse_904 og bygg nettverksgraf
@@ -50,10 +143,11 @@ print("=" * 60)
 print("Steg 2: Leser Bruksklasse_904 og bygger nettverksgraf...")
 print("=" * 60)
 
-G           = nx.Graph()
+node_id     = {}   # node_key -> tett heltalls-id
+kant_u      = []   # kantliste (node-id-er) for CSR
+kant_v      = []
+kant_id_av  = {}   # pakket urettet kant (min_id << 32 | max_id) -> kant-id (første vid vinner)
 alle_vider  = []
-kant_til_id = {}   # (n_start, n_end) -> vid_int  (for brooppslag)
-sett_kanter = set()
 
 count_lest = 0
 skip_annet = 0
@@ -72,28 +166,32 @@ with arcpy.da.SearchCursor(FC_BK, read_cols) as cur:
             continue
 
         vid_int = int(vid)
-        pts = [pt for part in geom for pt in part if pt is not None]
-        if len(pts) < 2:
+        # Bare endepunktene trengs: firstPoint/lastPoint i stedet for å pakke ut alle vertekser
+        if geom.pointCount < 2:
             skip_annet += 1
             continue
 
-        n_start  = round_coord((pts[0].X,  pts[0].Y))
-        n_end    = round_coord((pts[-1].X, pts[-1].Y))
-        kant_key = (min(n_start, n_end), max(n_start, n_end))
+        p0, p1   = geom.firstPoint, geom.lastPoint
+        n_start  = node_key(p0.X, p0.Y)
+        n_end    = node_key(p1.X, p1.Y)
+        u        = node_id.setdefault(n_start, len(node_id))
+        v        = node_id.setdefault(n_end,   len(node_id))
+        kant_key = (u << 32) | v if u <= v else (v << 32) | u
 
-        vegref, kommune = vid_info.get(vid_int, ("", ""))
+        kid = kant_id_av.setdefault(kant_key, len(kant_u))
+        if kid == len(kant_u):
+            kant_u.append(u)
+            kant_v.append(v)
 
-        if kant_key not in sett_kanter:
-            G.add_edge(n_start, n_end, vid=vid_int)
-            kant_til_id[kant_key] = vid_int
-            sett_kanter.add(kant_key)
-
-        alle_vider.append((vid_int, geom, s0, s1, vegref, kommune, n_start, n_end))
+        alle_vider.append((vid_int, geom, s0, s1, u, v, kid))
         count_lest += 1
 
 print(f"  Lest inn:    {count_lest}")
 print(f"  Hoppet over: {skip_annet}")
-print(f"  Graf: {G.number_of_nodes()} noder, {G.number_of_edges()} kanter")
+indptr, nabo, nabo_kant = bygg_csr(
+    np.array(kant_u, dtype=np.int64), np.array(kant_v, dtype=np.int64), len(node_id)
+)
+print(f"  Graf: {len(node_id)} noder, {len(kant_u)} kanter")
 
 # ----------------------------------------------------------------
 # Steg 3: Finn broer (segmenter uten omkjøring)
@@ -102,25 +200,20 @@ print(f"  Graf: {G.number_of_nodes()} noder, {G.number_of_edges()} kanter")
 # ----------------------------------------------------------------
 print()
 print("=" * 60)
-print("Steg 3: Beregner broer (nx.bridges)...")
+print("Steg 3: Beregner broer (Tarjan)...")
 print("=" * 60)
 
-broer = set()
-for u, v in nx.bridges(G):
-    kant = (min(u, v), max(u, v))
-    broer.add(kant)
+er_bro  = finn_broer(indptr, nabo, nabo_kant, len(kant_u))
+n_broer = int(er_bro.sum())
 
-print(f"  Broer (rød):        {len(broer)}")
-print(f"  Ikke-broer (grønn): {G.number_of_edges() - len(broer)}")
+print(f"  Broer (rød):        {n_broer}")
+print(f"  Ikke-broer (grønn): {len(kant_u) - n_broer}")
 
 # ----------------------------------------------------------------
 # Steg 4: Bygg kant-status
 # ----------------------------------------------------------------
-kant_status = {}
-for vid, geom, s0, s1, vegref, kommune, n_start, n_end in alle_vider:
-    kant = (min(n_start, n_end), max(n_start, n_end))
-    # Grønn = ikke bro (har omkjøring)
-    kant_status[kant] = kant not in broer
+# Pr kant-id: bro = "JA" (uten omkjøring), ellers grønn = "NEI" (har omkjøring)
+kant_status = np.where(er_bro, "JA", "NEI").tolist()
 
 # ----------------------------------------------------------------
 # Steg 5: Lag output – Vegnett_MedOmkjoringStatus
@@ -140,43 +233,48 @@ arcpy.management.CreateFeatureclass(
     "POLYLINE", spatial_reference=sr
 )
 
-for fname, ftype, flen in [
-    ("VEGLENKESEKV_ID", "LONG",   None),
-    ("STARTPOS",        "DOUBLE", None),
-    ("SLUTTPOS",        "DOUBLE", None),
-    ("UTEN_OMKJORING",  "TEXT",   5),
-    ("GRAD_START",      "SHORT",  None),
-    ("GRAD_SLUTT",      "SHORT",  None),
-    ("LENGDE",          "DOUBLE", None),
-    ("VEGREF",          "TEXT",   50),
-    ("KOMMUNE",         "TEXT",   60),
-]:
-    if flen:
-        arcpy.management.AddField(OUTFC_STATUS, fname, ftype, field_length=flen)
-    else:
-        arcpy.management.AddField(OUTFC_STATUS, fname, ftype)
-
-node_grad  = dict(G.degree())
+# Alle felt i ett AddFields-kall (én skjemalås i stedet for ni)
+arcpy.management.AddFields(OUTFC_STATUS, [
+    ["VEGLENKESEKV_ID", "LONG"],
+    ["STARTPOS",        "DOUBLE"],
+    ["SLUTTPOS",        "DOUBLE"],
+    ["UTEN_OMKJORING",  "TEXT", "", 5],
+    ["GRAD_START",      "SHORT"],
+    ["GRAD_SLUTT",      "SHORT"],
+    ["LENGDE",          "DOUBLE"],
+    ["VEGREF",          "TEXT", "", 50],
+    ["KOMMUNE",         "TEXT", "", 60],
+])
+
+node_grad  = np.diff(indptr).tolist()   # node-id -> grad = antall naboer (løkke teller 2)
 write_cols = [
     "SHAPE@", "VEGLENKESEKV_ID", "STARTPOS", "SLUTTPOS",
     "UTEN_OMKJORING", "GRAD_START", "GRAD_SLUTT",
     "LENGDE", "VEGREF", "KOMMUNE"
 ]
 
-count_ja = count_nei = 0
-with arcpy.da.InsertCursor(OUTFC_STATUS, write_cols) as icur:
-    for vid, geom, s0, s1, vegref, kommune, n_start, n_end in alle_vider:
-        kant   = (min(n_start, n_end), max(n_start, n_end))
-        har_omkjoring = kant_status.get(kant, False)
-        status = "NEI" if har_omkjoring else "JA"
-        icur.insertRow([
-            geom, vid, s0, s1, status,
-            node_grad.get(n_start, 0),
-            node_grad.get(n_end,   0),
-            geom.length, vegref, kommune
-        ])
-        if status == "JA": count_ja  += 1
-        else:               count_nei += 1
+# NumPyArrayToFeatureClass lager bare punkter, så linjene skrives med InsertCursor –
+# men alle oppslag gjøres først, og innsettingen går i én edit-sesjon
+vegrefs, kommuner = vid_oppslag(
+    np.fromiter((r[0] for r in alle_vider), dtype=np.int64, count=len(alle_vider))
+)
+rader = []
+for (vid, geom, s0, s1, u, v, kid), vegref, kommune in zip(alle_vider, vegrefs, kommuner):
+    rader.append((
+        geom, vid, s0, s1, kant_status[kid],
+        node_grad[u],
+        node_grad[v],
+        geom.length, vegref, kommune
+    ))
+
+with arcpy.da.Editor(GDB):
+    with arcpy.da.InsertCursor(OUTFC_STATUS, write_cols) as icur:
+        for rad in rader:
+            icur.insertRow(rad)
+
+count_ja  = sum(1 for rad in rader if rad[4] == "JA")
+count_nei = len(rader) - count_ja
+del rader
 
 print(f"  Skrevet {count_ja + count_nei} segmenter")
 print(f"    JA  (rød):   {count_ja}")
@@ -206,23 +304,35 @@ print("=" * 60)
 
 if arcpy.Exists(FC_FLASKEHALSER):
     print("  Funnet – oppdaterer UTEN_OMKJORING...")
-    existing = [f.name for f in arcpy.ListFields(FC_FLASKEHALSER)]
-    if "UTEN_OMKJORING" not in existing:
-        arcpy.management.AddField(FC_FLASKEHALSER, "UTEN_OMKJORING", "TEXT", field_length=5)
-
-    status_lookup = {}
-    with arcpy.da.SearchCursor(OUTFC_STATUS, ["VEGLENKESEKV_ID", "UTEN_OMKJORING"]) as cur:
-        for vid, status in cur:
-            status_lookup[vid] = status
-
-    fl_fields = [f.name for f in arcpy.ListFields(FC_FLASKEHALSER)]
-    fl_id = "VEGLENKESEKV_ID" if "VEGLENKESEKV_ID" in fl_fields else "VEGLENKESEKVID"
-
+    existing = field_set(FC_FLASKEHALSER)
+    ensure_fields(FC_FLASKEHALSER, [("UTEN_OMKJORING", "TEXT", 5)])
+    fl_id = "VEGLENKESEKV_ID" if "VEGLENKESEKV_ID" in existing else "VEGLENKESEKVID"
+
+    # Siste forekomst pr VID vinner (som ved fortløpende dict-oppdatering): unique på reversert
+    # array. np.unique gir VID-ene sortert → oppslag med searchsorted i stedet for dict
+    arr = arcpy.da.FeatureClassToNumPyArray(
+        OUTFC_STATUS, ["VEGLENKESEKV_ID", "UTEN_OMKJORING"],
+        null_value={"VEGLENKESEKV_ID": -1, "UTEN_OMKJORING": ""},
+    )[::-1]
+    status_ids, siste = np.unique(arr["VEGLENKESEKV_ID"], return_index=True)
+    status_verdi = arr["UTEN_OMKJORING"][siste]
+    del arr
+
+    fl = arcpy.da.FeatureClassToNumPyArray(
+        FC_FLASKEHALSER, ["OID@", fl_id], null_value={fl_id: -1}
+    )
+    pos    = np.searchsorted(status_ids, fl[fl_id]).clip(max=max(len(status_ids) - 1, 0))
+    funnet = (status_ids[pos] == fl[fl_id]) if len(status_ids) else np.zeros(len(fl), dtype=bool)
+
+    # OID → status for radene med treff; resten får NULL (som .get(vid, None))
+    ny_status = dict(zip(fl["OID@"][funnet].tolist(), status_verdi[pos[funnet]].tolist()))
+    del fl, pos, funnet
+
+    # Én UpdateCursor-runde over eksisterende felt – skjema og feltrekkefølge beholdes
     oppdatert = 0
-    with arcpy.da.UpdateCursor(FC_FLASKEHALSER, [fl_id, "UTEN_OMKJORING"]) as ucur:
-        for row in ucur:
-            row[1] = status_lookup.get(row[0], None)
-            ucur.updateRow(row)
+    with arcpy.da.UpdateCursor(FC_FLASKEHALSER, ["OID@", "UTEN_OMKJORING"]) as ucur:
+        for oid, _ in ucur:
+            ucur.updateRow((oid, ny_status.get(oid) or None))
             oppdatert += 1
     print(f"  {oppdatert} rader oppdatert")
 else:
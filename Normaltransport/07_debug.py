@@ -41,11 +41,12 @@ FC_VEGNETT = os.path.join(GDB, "Vegnett")
 if arcpy.Exists(FC_VEGNETT):
     print("    OK – Vegnett funnet")
     print("    Felter:")
-    for f in arcpy.ListFields(FC_VEGNETT):
+    felt_vegnett = arcpy.ListFields(FC_VEGNETT)   # én ListFields, brukes til begge utskriftene
+    for f in felt_vegnett:
         print(f"      {f.name:<40} type={f.type:<10} length={f.length}")
     # Vis første rad som eksempel
     print("    Første rad (eksempel):")
-    fields = [f.name for f in arcpy.ListFields(FC_VEGNETT) if f.type != "Geometry"]
+    fields = [f.name for f in felt_vegnett if f.type != "Geometry"]
     with arcpy.da.SearchCursor(FC_VEGNETT, fields[:6]) as cur:
         for row in cur:
             for fname, val in zip(fields[:6], row):
@@ -1,35 +1,48 @@
 # 07_debug_csv.py – sjekk faktiske feltnavn og verdier i vegnett.csv
 
-import csv
+import pandas as pd
 
 CSV_FERGE = r"D:\Conda\Flaskehasler_git\mrfylke-trendanalyse\Normaltransport\vegnett_v2.csv"
 
-with open(CSV_FERGE, encoding="utf-8-sig", newline="") as f:
-    reader = csv.DictReader(f, delimiter=";")
-
-    # Skriv ut alle feltnavn
-    print("FELTNAVN I CSV:")
-    for felt in reader.fieldnames:
-        print(f"  '{felt}'")
-
-    print()
-
-    # Skriv ut unike verdier for relevante felt
-    netttype_verdier  = set()
-    typeveg_verdier   = set()
-    adskilte_verdier  = set()
-    arm_verdier       = set()
-    delstr_verdier    = set()
-
-    for row in reader:
-        netttype_verdier.add( (row.get("NET.TYPE")            or "").strip())
-        typeveg_verdier.add(  (row.get("NET.TYPEVEG")         or "").strip())
-        adskilte_verdier.add( (row.get("VSR.ADSKILTE_LØP")    or "").strip())
-        arm_verdier.add(      (row.get("VSR.STREKNING-ARM")   or "").strip())
-        try:
-            delstr_verdier.add(int((row.get("VSR.DELSTREKNING") or "0").strip()))
-        except ValueError:
-            pass
+KOLONNER = [
+    "NET.VEGLENKESEKVENSID", "NET.TYPE", "NET.TYPEVEG",
+    "NET.STARTNODE", "NET.SLUTTNODE",
+    "VSR.VEGSYSTEMREFERANSE", "VSR.ADSKILTE_LØP", "VSR.STREKNING-ARM", "VSR.DELSTREKNING",
+]
+
+# Skriv ut alle feltnavn (kun header-linjen leses)
+feltnavn = pd.read_csv(CSV_FERGE, sep=";", encoding="utf-8-sig", nrows=0).columns
+print("FELTNAVN I CSV:")
+for felt in feltnavn:
+    print(f"  '{felt}'")
+
+print()
+
+# Én lesing i C-parseren, bare kolonnene vi trenger. df har råverdiene (som eksemplene
+# under skriver ut); manglende kolonner blir None. rens har strippede verdier, None → ""
+df = pd.read_csv(
+    CSV_FERGE, sep=";", encoding="utf-8-sig",
+    usecols=lambda c: c in KOLONNER, dtype=str, keep_default_na=False,
+).reindex(columns=KOLONNER, fill_value=None)
+rens = df.fillna("").apply(lambda kol: kol.str.strip())
+
+
+def delstrekning_int(v):
+    """Som int(): ikke-heltall (f.eks. "1.5") hoppes over; tom verdi er 0."""
+    try:
+        return int((v or "0").strip())
+    except ValueError:
+        return None
+
+
+# Skriv ut unike verdier for relevante felt
+netttype_verdier = set(rens["NET.TYPE"].unique())
+typeveg_verdier  = set(rens["NET.TYPEVEG"].unique())
+adskilte_verdier = set(rens["VSR.ADSKILTE_LØP"].unique())
+arm_verdier      = set(rens["VSR.STREKNING-ARM"].unique())
+delstr_verdier   = {
+    v for v in map(delstrekning_int, df["VSR.DELSTREKNING"].unique()) if v is not None
+}
 
 print("NET.TYPE unike verdier:")
 for v in sorted(netttype_verdier):
@@ -59,32 +72,20 @@ print()
 
 # Vis eksempel på ferge-rader
 print("EKSEMPEL – ferge-rader (NET.TYPEVEG = Bilferje):")
-with open(CSV_FERGE, encoding="utf-8-sig", newline="") as f2:
-    reader2 = csv.DictReader(f2, delimiter=";")
-    count = 0
-    for row in reader2:
-        if (row.get("NET.TYPEVEG") or "").strip() == "Bilferje":
-            print(f"  VID={row.get('NET.VEGLENKESEKVENSID')}  "
-                  f"NET.TYPE={row.get('NET.TYPE')}  "
-                  f"VEGREF={row.get('VSR.VEGSYSTEMREFERANSE')}  "
-                  f"STARTNODE={row.get('NET.STARTNODE')}  "
-                  f"SLUTTNODE={row.get('NET.SLUTTNODE')}")
-            count += 1
-            if count >= 5:
-                break
+ferge = df[rens["NET.TYPEVEG"] == "Bilferje"].head(5)
+for _, row in ferge.iterrows():
+    print(f"  VID={row['NET.VEGLENKESEKVENSID']}  "
+          f"NET.TYPE={row['NET.TYPE']}  "
+          f"VEGREF={row['VSR.VEGSYSTEMREFERANSE']}  "
+          f"STARTNODE={row['NET.STARTNODE']}  "
+          f"SLUTTNODE={row['NET.SLUTTNODE']}")
 
 # Vis eksempel på konnektering-kandidater
 print()
 print("EKSEMPEL – mulige konnekteringer (NET.TYPE != HOVED):")
-with open(CSV_FERGE, encoding="utf-8-sig", newline="") as f3:
-    reader3 = csv.DictReader(f3, delimiter=";")
-    count = 0
-    for row in reader3:
-        ntype = (row.get("NET.TYPE") or "").strip().upper()
-        if ntype not in ("HOVED", ""):
-            print(f"  VID={row.get('NET.VEGLENKESEKVENSID')}  "
-                  f"NET.TYPE='{ntype}'  "
-                  f"VEGREF={row.get('VSR.VEGSYSTEMREFERANSE')}")
-            count += 1
-            if count >= 10:
-                break
+ntype = rens["NET.TYPE"].str.upper()
+konn  = df[~ntype.isin(["HOVED", ""])].head(10)
+for idx, row in konn.iterrows():
+    print(f"  VID={row['NET.VEGLENKESEKVENSID']}  "
+          f"NET.TYPE='{ntype[idx]}'  "
+          f"VEGREF={row['VSR.VEGSYSTEMREFERANSE']}")
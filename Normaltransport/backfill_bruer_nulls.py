@@ -8,115 +8,101 @@ import arcpy
 import os
 import re
 
+import numpy as np
+import pandas as pd
+
 arcpy.env.overwriteOutput = True
 
 GDB    = r"D:\Conda\Flaskehasler_git\mrfylke-trendanalyse\Normaltransport\gdb\nvdb_radata.gdb"
 FC     = os.path.join(GDB, "Bruer")
 
-# ALLE_EG-nøkkel → GDB-felt + konverteringsfunksjon
-# Nøkkel er lowercase, matcher substring i ALLE_EG-token
-FELT_MAP = {
-    "byggverkstype":     ("BRUTYPE",          str),
-    "lengde":            ("LENGDE_M",         float),
-    "status":            ("TRAFIKKSTATUS",     str),
-    "driftsmerking":     ("DRIFTSMERKING",     str),
-    "brutusnummer":      ("DRIFTSMERKING",     str),   # fallback for driftsmerking
-}
-
 # Felt vi ønsker å backfille (ikke overskriv eksisterende verdier)
 BACKFILL_FELT = [
     "BRUTYPE", "LENGDE_M", "TRAFIKKSTATUS", "DRIFTSMERKING",
 ]
 
-_num_re = re.compile(r"(\d+(?:[.,]\d+)?)")
 
-def parse_float(x):
-    if x is None:
-        return None
-    m = _num_re.search(str(x))
-    return float(m.group(1).replace(",", ".")) if m else None
+def token_monster(nokkel: str) -> str:
+    """
+    Regex for verdien i første ALLE_EG-token ('Navn: verdi', skilt med '|' eller
+    linjeskift) der navnet inneholder nokkel (uten hensyn til store/små bokstaver).
+    """
+    return rf"(?i)(?:^|[|\n])[^:|\n]*{re.escape(nokkel)}[^:|\n]*:([^|\n]*)"
 
 
-def parse_alle_eg(tekst: str) -> dict:
+# GDB-felt → regex mot ALLE_EG (kjøres over hele kolonnen med str.extract)
+MONSTER = {
+    "BRUTYPE":       token_monster("byggverkstype"),
+    # Eksakt nøkkel "lengde" for å unngå "lengste spenn"
+    "LENGDE_M":      r"(?i)(?:^|[|\n])\s*lengde\s*:([^|\n]*)",
+    "TRAFIKKSTATUS": token_monster("status"),
+    "DRIFTSMERKING": token_monster("driftsmerking"),
+}
+
+_NUM_MONSTER = r"(\d+(?:[.,]\d+)?)"
+
+
+def finn_nye_verdier(oids: np.ndarray, alle_eg: np.ndarray) -> dict:
     """
-    Parser 'Navn: verdi | Navn: verdi | ...' til dict {lowercase_navn: verdi}.
-    Bruker lowercase key for robust matching.
+    {oid: (verdi pr BACKFILL_FELT | None, ...)} for rader der ALLE_EG ga minst én verdi.
+    All parsing skjer kolonnevis i pandas sin str-motor – ingen Python-løkke pr rad.
+
+    Kolonnene holdes som "string" også når alle verdier mangler, ellers mister en tom
+    Lengde-kolonne .str-aksessoren (typisk ved ny kjøring, der nettopp de radene står igjen):
+
+    >>> finn_nye_verdier(np.array([1]), np.array(["Lengde: \\nByggverkstype: Platebru"]))
+    {1: ('Platebru', None, None, None)}
     """
-    if not tekst:
-        return {}
-    result = {}
-    for token in tekst.split("|"):
-        token = token.strip()
-        if ":" not in token:
-            continue
-        key, _, val = token.partition(":")
-        result[key.strip().lower()] = val.strip()
-    return result
-
-
-def finn_verdi(parsed: dict, substring: str):
-    """Finn første nøkkel i parsed som inneholder substring."""
-    for k, v in parsed.items():
-        if substring in k:
-            return v
-    return None
+    eg  = pd.Series(alle_eg, index=oids, dtype="string")
+    nye = pd.DataFrame({
+        felt: eg.str.extract(MONSTER[felt], expand=False).str.strip()
+        for felt in BACKFILL_FELT
+    })
+    nye = nye.mask(nye == "")   # tomme treff → mangler, uten å endre dtype
+    nye["LENGDE_M"] = pd.to_numeric(
+        nye["LENGDE_M"].str.extract(_NUM_MONSTER, expand=False).str.replace(",", ".", regex=False),
+        errors="coerce",
+    )
+
+    har = nye.notna().any(axis=1)
+    nye = nye[har].astype(object)
+    nye = nye.where(nye.notna(), None)
+    return dict(zip(nye.index.tolist(), nye.itertuples(index=False, name=None)))
 
 
 # ------------------------------
 # BACKFILL
 # ------------------------------
-cols = ["OBJECTID", "ALLE_EG"] + BACKFILL_FELT
+# Bare rader der minst ett felt mangler verdi – ferdig utfylte rader leses ikke engang
+where = " OR ".join(f"{f} IS NULL" for f in BACKFILL_FELT)
 updated = 0
-skipped = 0
 
 print(f"Starter backfill på {FC}...")
 
-with arcpy.da.UpdateCursor(FC, cols) as cur:
-    for row in cur:
-        oid      = row[0]
-        alle_eg  = row[1]
-
-        if not alle_eg:
-            skipped += 1
-            continue
-
-        parsed = parse_alle_eg(alle_eg)
-        endret = False
-
-        # BRUTYPE (idx 2)
-        if row[2] is None:
-            v = finn_verdi(parsed, "byggverkstype")
-            if v:
-                row[2] = v.strip()
-                endret = True
-
-        # LENGDE_M (idx 3)
-        if row[3] is None:
-            # Finn "lengde" men ikke "lengste spenn"
-            for k, v in parsed.items():
-                if k == "lengde":   # eksakt match for å unngå "lengste spenn"
-                    f = parse_float(v)
-                    if f is not None:
-                        row[3] = f
-                        endret = True
-                    break
-
-        # TRAFIKKSTATUS (idx 4)
-        if row[4] is None:
-            v = finn_verdi(parsed, "status")
-            if v:
-                row[4] = v.strip()
-                endret = True
-
-        # DRIFTSMERKING (idx 5)
-        if row[5] is None:
-            v = finn_verdi(parsed, "driftsmerking")
-            if v:
-                row[5] = v.strip()
-                endret = True
-
-        if endret:
-            cur.updateRow(row)
-            updated += 1
+# 1) Les ALLE_EG for kandidatradene i ett kall og parse hele kolonnen samlet
+arr = arcpy.da.TableToNumPyArray(
+    FC, ["OBJECTID", "ALLE_EG"], where_clause=where, null_value={"ALLE_EG": ""},
+)
+skipped = int((arr["ALLE_EG"] == "").sum())
+verdier = finn_nye_verdier(arr["OBJECTID"], arr["ALLE_EG"])
+
+# 2) Skriv tilbake bare felt som fortsatt er <Null>, på rader med nye verdier.
+#    Én edit-sesjon rundt hele oppdateringen (commit én gang, ikke pr updateRow)
+with arcpy.da.Editor(GDB):
+    with arcpy.da.UpdateCursor(FC, ["OBJECTID"] + BACKFILL_FELT, where_clause=where) as cur:
+        for row in cur:
+            nye_rad = verdier.get(row[0])
+            if nye_rad is None:
+                continue
+
+            endret = False
+            for i, v in enumerate(nye_rad, 1):
+                if row[i] is None and v is not None:
+                    row[i] = v
+                    endret = True
+
+            if endret:
+                cur.updateRow(row)
+                updated += 1
 
 print(f"✅ Backfill ferdig: {updated} rader oppdatert, {skipped} uten ALLE_EG.")
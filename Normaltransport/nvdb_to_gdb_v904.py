@@ -19,14 +19,25 @@ ALLE_EG vises som linjeskilt liste i ArcGIS popup:
 from __future__ import annotations
 
 import os
+import queue
 import re
+import threading
 import time
-from typing import Any, Dict, Iterable, Optional
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, Optional
 
 import arcpy
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson   # valgfri: raskere JSON-dekoding av store NVDB-sider
+except ImportError:
+    orjson = None
 
 arcpy.env.overwriteOutput = True
+arcpy.SetLogHistory(False)   # ingen GP-historikk/metadata-logging for Delete/CreateFeatureclass/AddFields
 
 # -------------------------
 # KONFIG
@@ -50,6 +61,9 @@ HEADERS = {
     "Accept":   "application/vnd.vegvesen.nvdb-v3+json",
 }
 TIMEOUT = 60
+PREFETCH_SIDER    = 4    # sider som hentes i forkant mens forrige skrives til GDB (0 = serielt)
+PREFETCH_VENTENDE = 8    # sider bufret pr lag som venter på tur – holder minnet begrenset til noen få sider
+STAGE_WS          = "memory"   # lagene bygges i minnet og skrives til GDB med én CopyFeatures
 
 
 # -------------------------
@@ -62,22 +76,30 @@ def log(msg: str) -> None:
 def create_session() -> requests.Session:
     s = requests.Session()
     s.headers.update(HEADERS)
+    # Keep-alive: gjenbruk TCP/TLS-forbindelsen mellom sidene. Lukker NVDB en gjenbrukt
+    # forbindelse (RemoteDisconnected/reset = lesefeil i urllib3) prøves GET-en én gang til
+    # på ny forbindelse her; tilkoblingsfeil og HTTP-statusfeil (429/5xx) håndteres bare
+    # med logging og backoff i _hent_sider
+    retry = Retry(total=1, connect=0, read=1, status=0,
+                  allowed_methods=frozenset(["GET"]))
+    s.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=retry))
     return s
 
 
 import time
 
-def iter_paged(
+def _hent_sider(
     session: requests.Session,
     url: str,
     params: Dict[str, Any],
     *,
     label: str,
-    log_every_page: bool = False,
-    max_pages: int = 100_000,
-    max_retries: int = 5,
-    retry_backoff: float = 2.0,   # sekunder, dobles per forsøk
-) -> Iterable[Dict[str, Any]]:
+    log_every_page: bool,
+    max_pages: int,
+    max_retries: int,
+    retry_backoff: float,
+) -> Iterable[list[Dict[str, Any]]]:
+    """Henter side for side (følger metadata.neste) og gir objektlisten pr side."""
     start: Optional[str] = None
     seen_starts: set[str] = set()
     seen_hrefs:  set[str] = set()
@@ -118,15 +140,21 @@ def iter_paged(
                 f"{label}: HTTP {status} etter {max_retries} forsøk for {next_url}"
             )
 
-        data = r.json()
+        data = orjson.loads(r.content) if orjson is not None else r.json()
         objs = data.get("objekter", []) or []
         if not objs:
             return
 
-        yield from objs
-
+        # Neste-peker leses før siden gis videre: produsenttråden kan be om neste side med
+        # en gang siden er lagt i køen, og svar-dicten og rå-bytene slippes mens siden skrives
         nxt       = (data.get("metadata") or {}).get("neste") or {}
         nxt_start = nxt.get("start")
+        nxt_href  = nxt.get("href")
+        del data
+        r.close()
+        r = None
+
+        yield objs
 
         if nxt_start:
             if nxt_start in seen_starts:
@@ -136,7 +164,7 @@ def iter_paged(
             start = str(nxt_start)
             continue
 
-        href = nxt.get("href")
+        href = nxt_href
         if href:
             if href in seen_hrefs:
                 log(f"⚠️ {label}: neste.href repeteres. Avbryter.")
@@ -149,18 +177,139 @@ def iter_paged(
 
         return
 
-def to_geometry(geom: Optional[Dict[str, Any]]):
-    if not geom:
+
+_SLUTT = object()   # markør: produsenten er ferdig
+
+
+def iter_paged(
+    session: requests.Session,
+    url: str,
+    params: Dict[str, Any],
+    *,
+    label: str,
+    log_every_page: bool = False,
+    max_pages: int = 100_000,
+    max_retries: int = 5,
+    retry_backoff: float = 2.0,   # sekunder, dobles per forsøk
+    prefetch: int = PREFETCH_SIDER,
+) -> Iterable[Dict[str, Any]]:
+    """Alle objekter fra en paginert NVDB-spørring.
+
+    Med prefetch > 0 starter hentingen straks i en bakgrunnstråd (også før kalleren
+    begynner å lese), og inntil prefetch sider bufres mens kalleren skriver til GDB.
+    """
+    sider = _hent_sider(
+        session, url, params,
+        label=label, log_every_page=log_every_page, max_pages=max_pages,
+        max_retries=max_retries, retry_backoff=retry_backoff,
+    )
+    if prefetch <= 0:
+        return (o for objs in sider for o in objs)
+
+    ko    = queue.Queue(maxsize=prefetch)
+    stopp = threading.Event()   # settes når kalleren er ferdig (eller avbryter)
+
+    def legg_i(element) -> bool:
+        while not stopp.is_set():
+            try:
+                ko.put(element, timeout=0.5)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produsent() -> None:
+        try:
+            for objs in sider:
+                if not legg_i(objs):
+                    return
+        except Exception as e:   # videresendes og kastes i kallerens tråd
+            legg_i(e)
+            return
+        legg_i(_SLUTT)
+
+    threading.Thread(target=produsent, name=f"nvdb-{label}", daemon=True).start()
+    return _les_ko(ko, stopp)
+
+
+def _les_ko(ko: queue.Queue, stopp: threading.Event) -> Iterable[Dict[str, Any]]:
+    try:
+        while True:
+            element = ko.get()
+            if element is _SLUTT:
+                return
+            if isinstance(element, Exception):
+                raise element
+            yield from element
+    finally:
+        stopp.set()
+
+
+_SR: Optional[arcpy.SpatialReference] = None   # opprettes ved første geometri, gjenbrukes
+
+
+def _sr() -> arcpy.SpatialReference:
+    global _SR
+    if _SR is None:
+        _SR = arcpy.SpatialReference(SRID)
+    return _SR
+
+
+def _fra_wkt_ucachet(wkt: str):
+    try:
+        return arcpy.FromWKT(wkt, _sr())
+    except Exception:
         return None
-    wkt = geom.get("wkt")
-    if not wkt:
+
+
+@lru_cache(maxsize=4096)
+def _fra_wkt(wkt: str):
+    """FromWKT med cache: like WKT-er (f.eks. BK-objekter med samme stedfesting) parses én gang."""
+    return _fra_wkt_ucachet(wkt)
+
+
+def _punkt_fra_wkt(wkt: str):
+    """'POINT (x y)' / 'POINT Z(x y z)' → PointGeometry direkte, uten FromWKT. None = ikke gjenkjent."""
+    start = wkt.find("(")
+    slutt = wkt.find(")", start + 1)
+    if start < 0 or slutt < 0:
+        return None
+    xyz = wkt[start + 1:slutt].split()
+    if len(xyz) < 2:
         return None
     try:
-        return arcpy.FromWKT(wkt, arcpy.SpatialReference(SRID))
+        return arcpy.PointGeometry(arcpy.Point(float(xyz[0]), float(xyz[1])), _sr())
     except Exception:
         return None
 
 
+@lru_cache(maxsize=1024)
+def _linje_fra_wkt(wkt: str):
+    """Som _fra_wkt, men flater gjøres om til omriss – også omrisset caches."""
+    g = _fra_wkt(wkt)
+    if g is not None and g.type == "polygon":
+        return g.boundary()
+    return g
+
+
+def to_geometry(geom: Optional[Dict[str, Any]], *, cache: bool = True, som_linje: bool = False):
+    """WKT → arcpy-geometri. cache=False for lag der hver geometri er unik (vegnettet):
+    da fylles ikke FromWKT-cachen med lange linjer som aldri treffes igjen.
+    som_linje=True gir omrisset for flategeometrier (polylinjelag)."""
+    if not geom:
+        return None
+    wkt = geom.get("wkt")
+    if not wkt:
+        return None
+    if wkt.startswith("POINT"):
+        punkt = _punkt_fra_wkt(wkt)
+        if punkt is not None:
+            return punkt
+    if som_linje:
+        return _linje_fra_wkt(wkt)
+    return _fra_wkt(wkt) if cache else _fra_wkt_ucachet(wkt)
+
+
 def create_gdb(path: str) -> None:
     folder, name = os.path.split(path)
     if not os.path.exists(folder):
@@ -175,18 +324,28 @@ def create_fc(gdb: str, name: str, geom_type: str, extra_fields: list[tuple]) ->
     if arcpy.Exists(fc):
         arcpy.management.Delete(fc)
     arcpy.management.CreateFeatureclass(gdb, name, geom_type, spatial_reference=SRID)
-    arcpy.management.AddField(fc, "VEGLENKESEKV_ID", "LONG")
-    arcpy.management.AddField(fc, "STARTPOS",        "DOUBLE")
-    arcpy.management.AddField(fc, "SLUTTPOS",        "DOUBLE")
-    for f in extra_fields:
-        if len(f) == 2:
-            arcpy.management.AddField(fc, f[0], f[1])
-        else:
-            arcpy.management.AddField(fc, f[0], f[1], field_length=f[2])
+    # Alle felt i ett AddFields-kall
+    arcpy.management.AddFields(fc, [
+        ["VEGLENKESEKV_ID", "LONG"],
+        ["STARTPOS",        "DOUBLE"],
+        ["SLUTTPOS",        "DOUBLE"],
+        *([f[0], f[1]] if len(f) == 2 else [f[0], f[1], "", f[2]] for f in extra_fields),
+    ])
+    return fc
+
+
+def lagre_fc(stage_fc: str, gdb: str) -> str:
+    """Kopierer et ferdig lag fra STAGE_WS til gdb i én masseskriving og frigjør minnet."""
+    fc = os.path.join(gdb, os.path.basename(stage_fc))
+    if arcpy.Exists(fc):
+        arcpy.management.Delete(fc)
+    arcpy.management.CopyFeatures(stage_fc, fc)
+    arcpy.management.Delete(stage_fc)
     return fc
 
 
 _num_re = re.compile(r"(\d+(?:[.,]\d+)?)")
+_merknad_len_re = re.compile(r"(\d+(?:[.,]\d+)?)\s*m(?:eter)?\b", re.IGNORECASE)   # «19,5 m», «22 meter»
 
 
 def parse_float_any(x: Any) -> Optional[float]:
@@ -194,42 +353,101 @@ def parse_float_any(x: Any) -> Optional[float]:
         return None
     if isinstance(x, (int, float)):
         return float(x)
-    s = str(x).strip()
+    return _parse_float_tekst(str(x))
+
+
+@lru_cache(maxsize=8192)
+def _parse_float_tekst(tekst: str) -> Optional[float]:
+    """Første tall i teksten. Cachet: måle- og lengdetekstene gjentas fra objekt til objekt."""
+    s = tekst.strip()
+    # Hurtigsti for rene tall («12», «12,5», «4.2») – én float()-konvertering, ingen regex
+    t = s.replace(",", ".", 1)
+    if t[:1].isdigit() and t.isascii() and t.replace(".", "", 1).isdigit():
+        return float(t)
     m = _num_re.search(s)
     if not m:
         return None
     return float(m.group(1).replace(",", "."))
 
 
+@lru_cache(maxsize=1024)
 def parse_tonn_from_text(s: Optional[str]) -> Optional[int]:
+    """Tonn fra BK-/brukslast-tekst i én forovergang (ingen regex).
+
+    Prioritet som før: tall etter "/" ("Bk10/60" → 60), så tall foran "tonn"
+    ("50 tonn" → 50), ellers største tall i teksten. Bruksklassetekstene er et lite
+    kodeverk, så resultatet caches pr tekst.
+    """
     if not s:
         return None
-    m = re.search(r"/\s*(\d+)", s)
-    if m:
-        return int(m.group(1))
-    m = re.search(r"(\d+)\s*tonn", s, re.IGNORECASE)
-    if m:
-        return int(m.group(1))
-    nums = [int(n) for n in re.findall(r"(\d+)", s)]
-    return max(nums) if nums else None
+    tonn_val: Optional[int] = None
+    maks:     Optional[int] = None
+    etter_slash = False   # forrige ikke-blanke tegn var "/"
+    i, n = 0, len(s)
+    while i < n:
+        c = s[i]
+        if "0" <= c <= "9":
+            cur = 0
+            while i < n and "0" <= s[i] <= "9":
+                cur = cur * 10 + (ord(s[i]) - 48)
+                i += 1
+            if etter_slash:
+                return cur
+            if tonn_val is None:
+                k = i
+                while k < n and s[k].isspace():
+                    k += 1
+                if s[k:k + 4].lower() == "tonn":
+                    tonn_val = cur
+            if maks is None or cur > maks:
+                maks = cur
+            continue
+        if c == "/":
+            etter_slash = True
+        elif not c.isspace():
+            etter_slash = False
+        i += 1
+    return tonn_val if tonn_val is not None else maks
+
 
+@lru_cache(maxsize=None)
+def _eg_matcher(wanted: tuple[tuple[str, tuple[str, ...]], ...]) -> Callable[[str], tuple[str, ...]]:
+    """Navn → nøklene i wanted som navnet treffer, cachet pr navn.
 
-def pick_property(
+    Én matcher pr wanted-tuppel, slik at den nøstede tuppelen hashes én gang pr objekt
+    (i scan_eg) og ikke én gang pr egenskap.
+    """
+    @lru_cache(maxsize=None)
+    def nokler(navn: str) -> tuple[str, ...]:
+        n = navn.lower()
+        return tuple(key for key, subs in wanted if any(sub in n for sub in subs))
+    return nokler
+
+
+def scan_eg(
     egenskaper: list[Dict[str, Any]],
-    name_contains: list[str],
-) -> Optional[Dict[str, Any]]:
+    wanted: tuple[tuple[str, tuple[str, ...]], ...],
+) -> Dict[str, Dict[str, Any]]:
+    """Første egenskap pr nøkkel i wanted ((nøkkel, (substreng, ...)), ...) – én gjennomgang.
+
+    Samme treff som et eget søk pr nøkkel (første egenskap i rekkefølge), men hvert
+    distinkte navn matches bare én gang (_eg_matcher). Substrengene må være lowercase.
+    """
+    funnet: Dict[str, Dict[str, Any]] = {}
     if not egenskaper:
-        return None
+        return funnet
+    nokler = _eg_matcher(wanted)
     for e in egenskaper:
-        navn = (e.get("navn") or "").lower()
-        if any(sub.lower() in navn for sub in name_contains):
-            return e
-    return None
+        for key in nokler(e.get("navn") or ""):
+            if key not in funnet:
+                funnet[key] = e
+        if len(funnet) == len(wanted):
+            break
+    return funnet
 
 
-def eg_verdi(eg: list, *name_contains: str) -> Optional[str]:
-    """Hent første match som streng (stripped)."""
-    e = pick_property(eg, list(name_contains))
+def eg_tekst(e: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Verdien til egenskapen som streng (stripped), eller None."""
     if e and e.get("verdi") is not None:
         return str(e["verdi"]).strip()
     return None
@@ -255,30 +473,33 @@ def alle_eg_tekst(eg: list, max_len: int = 2000) -> Optional[str]:
     return tekst[:max_len] if len(tekst) > max_len else tekst
 
 
-def safe_insert(
-    cur,
-    row,
-    *,
-    err_prefix: str,
-    err_counter: dict,
-    max_print: int = 10,
-) -> None:
-    try:
-        cur.insertRow(row)
-    except Exception as e:
-        err_counter["n"] += 1
-        if err_counter["n"] <= max_print:
-            log(f"{err_prefix}: {e}")
-
-
 # -------------------------
 # 1. VEGNETT
 # -------------------------
-def hent_vegnett(session: requests.Session, gdb: str) -> str:
+def les_vegnett(session: requests.Session, prefetch: int = PREFETCH_SIDER) -> Iterable[Dict[str, Any]]:
+    """Starter nedlastingen av vegnett-segmentene; objektene hentes i bakgrunnen."""
+    url    = f"{VEGNETT_API}/veglenkesekvenser/segmentert"
+    params = {
+        "fylke":              FYLKE,
+        "vegsystemreferanse": VEGSYSTEMREF,
+        "antall":             5000,
+        "inkluderAntall":     "false",
+        "srid":               SRID,
+    }
+    return iter_paged(session, url, params, label="vegnett", prefetch=prefetch)
+
+
+def hent_vegnett(
+    session: requests.Session,
+    gdb: str,
+    objekter: Optional[Iterable[Dict[str, Any]]] = None,
+) -> str:
     log("Henter vegnett (FV, segmentert, med posisjon)...")
+    if objekter is None:
+        objekter = les_vegnett(session)
 
     fc = create_fc(
-        gdb, "Vegnett", "POLYLINE",
+        STAGE_WS, "Vegnett", "POLYLINE",
         [
             ("VEGKATEGORI", "TEXT",  1),
             ("VEGNUMMER",   "LONG"),
@@ -288,15 +509,6 @@ def hent_vegnett(session: requests.Session, gdb: str) -> str:
         ],
     )
 
-    url    = f"{VEGNETT_API}/veglenkesekvenser/segmentert"
-    params = {
-        "fylke":              FYLKE,
-        "vegsystemreferanse": VEGSYSTEMREF,
-        "antall":             5000,
-        "inkluderAntall":     "false",
-        "srid":               SRID,
-    }
-
     cnt  = 0
     cols = [
         "SHAPE@", "VEGLENKESEKV_ID", "STARTPOS", "SLUTTPOS",
@@ -304,11 +516,16 @@ def hent_vegnett(session: requests.Session, gdb: str) -> str:
     ]
 
     with arcpy.da.InsertCursor(fc, cols) as cur:
-        for seg in iter_paged(session, url, params, label="vegnett"):
+        ins = cur.insertRow   # bundet én gang, ikke pr rad
+        for seg in objekter:
             vr = seg.get("vegsystemreferanse", {})
-            if vr.get("strekning", {}).get("trafikantgruppe") != TRAFIKANTGRP:
+            try:
+                tg = vr["strekning"]["trafikantgruppe"]
+            except (KeyError, TypeError):
+                tg = None
+            if tg != TRAFIKANTGRP:
                 continue
-            geom = to_geometry(seg.get("geometri"))
+            geom = to_geometry(seg.get("geometri"), cache=False)
             if not geom:
                 continue
 
@@ -324,11 +541,11 @@ def hent_vegnett(session: requests.Session, gdb: str) -> str:
             kommune   = str(loc["kommuner"][0]) if loc.get("kommuner") else None
             fylkenavn = str(loc["fylker"][0])   if loc.get("fylker")   else None
 
-            cur.insertRow((
+            ins((
                 geom,
-                int(seg["veglenkesekvensid"]),
-                float(seg.get("startposisjon", 0.0)),
-                float(seg.get("sluttposisjon",  0.0)),
+                seg["veglenkesekvensid"],
+                seg.get("startposisjon") or 0.0,
+                seg.get("sluttposisjon") or 0.0,
                 vs.get("vegkategori"),
                 vs.get("nummer"),
                 vegref,
@@ -337,6 +554,7 @@ def hent_vegnett(session: requests.Session, gdb: str) -> str:
             ))
             cnt += 1
 
+    fc = lagre_fc(fc, gdb)
     log(f"Vegnett ferdig: {cnt} segmenter")
     return fc
 
@@ -344,8 +562,49 @@ def hent_vegnett(session: requests.Session, gdb: str) -> str:
 # -------------------------
 # 2. BRUER (60)
 # -------------------------
-def hent_bruer(session: requests.Session, gdb: str) -> str:
+def les_bruer(session: requests.Session, prefetch: int = PREFETCH_SIDER) -> Iterable[Dict[str, Any]]:
+    """Starter nedlastingen av bruene (60); objektene hentes i bakgrunnen."""
+    url    = f"{VEGOBJ_API}/vegobjekter/{OBJ_BRU}"
+    params = {
+        "fylke":              FYLKE,
+        "vegsystemreferanse": VEGSYSTEMREF,
+        "antall":             1000,
+        "inkluder":           "egenskaper,lokasjon,geometri",
+        # Uten assosiasjoner (lange lister, ingen verdi vi leser). Snevrere utvalg går ikke:
+        # egenskap= filtrerer objekter (ikke felt), og ALLE_EG skal ha alle basis-egenskapene
+        "inkluder_egenskaper": "basis",
+        "srid":               SRID,
+    }
+    return iter_paged(session, url, params, label="bruer60", log_every_page=True, prefetch=prefetch)
+
+
+@lru_cache(maxsize=None)
+def _bru_tall_roller(navn: str) -> tuple[str, ...]:
+    """Tallfeltene en bru-egenskap fyller, ut fra navnet – beregnes én gang pr distinkt navn."""
+    n = navn.lower()
+    roller = []
+    if any(k in n for k in ("byggeår", "bygge år", "byggeaar")):
+        roller.append("byggeaar")
+    # Eksakt match "lengde" — unngår "lengste spenn", "lengde bruoverbygning" osv.
+    if n == "lengde":
+        roller.append("lengde")
+    if "bredde" in n:
+        roller.append("bredde")
+    if "brukslast" in n:
+        roller.append("brukslast")
+    if "tillatt" in n and "tonn" in n:
+        roller.append("tillatt")
+    return tuple(roller)
+
+
+def hent_bruer(
+    session: requests.Session,
+    gdb: str,
+    objekter: Optional[Iterable[Dict[str, Any]]] = None,
+) -> str:
     log("Henter bruer (60) med posisjon...")
+    if objekter is None:
+        objekter = les_bruer(session)
 
     fields = [
         ("NVDB_ID",          "LONG"),
@@ -364,17 +623,7 @@ def hent_bruer(session: requests.Session, gdb: str) -> str:
         ("MERKNAD",          "TEXT",  200),
         ("ALLE_EG",          "TEXT", 2000),
     ]
-    fc = create_fc(gdb, "Bruer", "POLYLINE", fields)
-
-    url    = f"{VEGOBJ_API}/vegobjekter/{OBJ_BRU}"
-    params = {
-        "fylke":              FYLKE,
-        "vegsystemreferanse": VEGSYSTEMREF,
-        "antall":             1000,
-        "inkluder":           "egenskaper,lokasjon,geometri",
-        "srid":               SRID,
-        "alle_versjoner":     "false",
-    }
+    fc = create_fc(STAGE_WS, "Bruer", "POLYLINE", fields)
 
     EKSKLUDER_BYGGVERKSTYPE = {
         "tunnelportal", "tunnel", "kulvert", "stikkrenne",
@@ -385,6 +634,33 @@ def hent_bruer(session: requests.Session, gdb: str) -> str:
         "tunnel", "vegoverbygg", "overbygg",
     }
 
+    @lru_cache(maxsize=None)
+    def ekskluder(brutype: Optional[str], brukategori: Optional[str], trafikkstatus: Optional[str]) -> bool:
+        """Tunnelportal, kulvert, gangbru osv., eller ikke trafikkert. Kodeverdiene gjentas
+        fra bru til bru, så hver kombinasjon senkes og testes bare én gang."""
+        if brutype:
+            bt = brutype.lower()
+            if any(k in bt for k in EKSKLUDER_BYGGVERKSTYPE):
+                return True
+        if brukategori:
+            bk = brukategori.lower()
+            if any(k in bk for k in EKSKLUDER_BRUKATEGORI):
+                return True
+        return bool(trafikkstatus) and "ikke trafikkert" in trafikkstatus.lower()
+
+    # Navngitte egenskaper – hentes i én scan_eg-gjennomgang pr objekt
+    WANTED = (
+        ("navn",          ("navn",)),
+        ("brukslast",     ("brukslast vegbane", "brukslast")),
+        ("brutype",       ("byggverkstype", "brutype", "bru type", "konstruksjonstype")),
+        ("brukategori",   ("brukategori",)),
+        ("driftsmerking", ("driftsmerking", "brutusnummer")),
+        ("eier",          ("eier",)),
+        ("vedl_ans",      ("vedlikeholdsansvarlig", "vedlikehold")),
+        ("merknad",       ("merknad",)),
+        ("status",        ("status", "trafikkstatus")),
+    )
+
     cnt_rows = 0
     cnt_objs = 0
     cnt_skip = 0
@@ -398,30 +674,35 @@ def hent_bruer(session: requests.Session, gdb: str) -> str:
     ]
 
     with arcpy.da.InsertCursor(fc, cols) as cur:
-        for o in iter_paged(session, url, params, label="bruer60", log_every_page=True):
+        ins = cur.insertRow
+        for o in objekter:
             cnt_objs += 1
             if cnt_objs % 200 == 0:
                 log(f"[bruer60] lest: {cnt_objs}, skrevet: {cnt_rows}, hoppet: {cnt_skip}")
 
-            if not any(
-                v.get("strekning", {}).get("trafikantgruppe") == TRAFIKANTGRP
-                for v in (o.get("lokasjon") or {}).get("vegsystemreferanser", [])
-            ):
-                continue
+            lok = o.get("lokasjon") or {}
+            for v in lok.get("vegsystemreferanser") or ():
+                strek = v.get("strekning")
+                if strek is not None and strek.get("trafikantgruppe") == TRAFIKANTGRP:
+                    break
+            else:
+                continue   # ingen kjørende-referanse
 
             eg = o.get("egenskaper", []) or []
 
-            navn          = eg_verdi(eg, "navn")
-            brukslast     = eg_verdi(eg, "brukslast vegbane", "brukslast")
-            brutype_tekst = eg_verdi(eg, "byggverkstype", "brutype", "bru type", "konstruksjonstype")
-            brukategori   = eg_verdi(eg, "brukategori")
-            driftsmerking = eg_verdi(eg, "driftsmerking", "brutusnummer")
-            eier          = eg_verdi(eg, "eier")
-            vedl_ans      = eg_verdi(eg, "vedlikeholdsansvarlig", "vedlikehold")
-            merknad       = eg_verdi(eg, "merknad")
+            ev = scan_eg(eg, WANTED)
+
+            navn          = eg_tekst(ev.get("navn"))
+            brukslast     = eg_tekst(ev.get("brukslast"))
+            brutype_tekst = eg_tekst(ev.get("brutype"))
+            brukategori   = eg_tekst(ev.get("brukategori"))
+            driftsmerking = eg_tekst(ev.get("driftsmerking"))
+            eier          = eg_tekst(ev.get("eier"))
+            vedl_ans      = eg_tekst(ev.get("vedl_ans"))
+            merknad       = eg_tekst(ev.get("merknad"))
 
             # TRAFIKKSTATUS: eksakt felt "Status" + strip() for trailing space
-            trafikkstatus = eg_verdi(eg, "status", "trafikkstatus")
+            trafikkstatus = eg_tekst(ev.get("status"))
 
             byggeaar = None
             lengde_m = None
@@ -429,69 +710,52 @@ def hent_bruer(session: requests.Session, gdb: str) -> str:
             tillatt  = None
 
             for e in eg:
-                enavn = (e.get("navn") or "").lower()
-                val   = e.get("verdi")
-
-                if any(k in enavn for k in ("byggeår", "bygge år", "byggeaar")):
-                    v = parse_float_any(val)
-                    if v:
-                        byggeaar = int(v)
-
-                # Eksakt match "lengde" — unngår "lengste spenn", "lengde bruoverbygning" osv.
-                if enavn == "lengde" and val is not None:
-                    lengde_m = parse_float_any(val)
-
-                if "bredde" in enavn and val is not None:
-                    bredde_m = parse_float_any(val)
-
-                if "brukslast" in enavn:
-                    t = parse_tonn_from_text(str(val) if val is not None else None)
-                    if t is not None:
-                        tillatt = t
-
-                if tillatt is None and "tillatt" in enavn and "tonn" in enavn:
-                    t = parse_tonn_from_text(str(val) if val is not None else None)
-                    if t is not None:
-                        tillatt = t
-
-            # Filter: tunnelportal, kulvert, gangbru osv.
-            ekskluder = False
-            if brutype_tekst and any(
-                ekskl in brutype_tekst.lower() for ekskl in EKSKLUDER_BYGGVERKSTYPE
-            ):
-                ekskluder = True
-            if brukategori and any(
-                k in brukategori.lower() for k in EKSKLUDER_BRUKATEGORI
-            ):
-                ekskluder = True
-            if ekskluder:
+                roller = _bru_tall_roller(e.get("navn") or "")
+                if not roller:
+                    continue
+                val = e.get("verdi")
+
+                for rolle in roller:
+                    if rolle == "byggeaar":
+                        v = parse_float_any(val)
+                        if v:
+                            byggeaar = int(v)
+                    elif val is None:
+                        continue
+                    elif rolle == "lengde":
+                        lengde_m = parse_float_any(val)
+                    elif rolle == "bredde":
+                        bredde_m = parse_float_any(val)
+                    elif rolle == "brukslast" or tillatt is None:   # "tillatt": bare som fallback
+                        t = parse_tonn_from_text(str(val))
+                        if t is not None:
+                            tillatt = t
+
+            # Filter: tunnelportal, kulvert, gangbru osv. + ikke trafikkert
+            if ekskluder(brutype_tekst, brukategori, trafikkstatus):
                 cnt_skip += 1
                 continue
 
-            # Filter: ikke trafikkert
-            if trafikkstatus and "ikke trafikkert" in trafikkstatus.lower():
-                cnt_skip += 1
+            # Bare stedfestinger med veglenkesekvens gir rader – uten noen er geometrien unødvendig
+            stedf = [s for s in lok.get("stedfestinger") or () if s.get("veglenkesekvensid")]
+            if not stedf:
                 continue
 
-            geom = to_geometry(o.get("geometri"))
+            geom = to_geometry(o.get("geometri"), som_linje=True)
             if not geom:
                 continue
-            if geom.type == "polygon":
-                geom = geom.boundary()
 
             alle_eg = alle_eg_tekst(eg)
 
-            for s in (o.get("lokasjon") or {}).get("stedfestinger", []) or []:
-                if not s.get("veglenkesekvensid"):
-                    continue
-                safe_insert(
-                    cur,
-                    (
+            nvdb_id = o["id"]   # JSON-tall → allerede int; ingen konvertering pr rad
+            for s in stedf:
+                try:
+                    ins((
                         geom,
-                        int(s["veglenkesekvensid"]),
-                        float(s.get("startposisjon", 0.0)),
-                        float(s.get("sluttposisjon",  0.0)),
-                        int(o["id"]),
+                        s["veglenkesekvensid"],
+                        s.get("startposisjon") or 0.0,
+                        s.get("sluttposisjon") or 0.0,
+                        nvdb_id,
                         navn,
                         tillatt,
                         brukslast,
@@ -506,12 +770,14 @@ def hent_bruer(session: requests.Session, gdb: str) -> str:
                         trafikkstatus,
                         merknad,
                         alle_eg,
-                    ),
-                    err_prefix=f"[bru id={o.get('id')}] insert-feil",
-                    err_counter=err,
-                )
+                    ))
+                except Exception as e:   # feilmeldingen bygges bare når innsettingen feiler
+                    err["n"] += 1
+                    if err["n"] <= 10:
+                        log(f"[bru id={nvdb_id}] insert-feil: {e}")
                 cnt_rows += 1
 
+    fc = lagre_fc(fc, gdb)
     log(f"Bruer ferdig: objekter={cnt_objs}, rader={cnt_rows}, hoppet over={cnt_skip}")
     if err["n"]:
         log(f"⚠️ {err['n']} bru-rader hoppet over pga insert-feil.")
@@ -521,7 +787,39 @@ def hent_bruer(session: requests.Session, gdb: str) -> str:
 # -------------------------
 # 3. BRUKSKLASSE NORMALTRANSPORT (904)
 # -------------------------
-def hent_bruksklasse_904(session: requests.Session, gdb: str) -> str:
+def les_bruksklasse_904(session: requests.Session, prefetch: int = PREFETCH_SIDER) -> Iterable[Dict[str, Any]]:
+    """Starter nedlastingen av bruksklasse-objektene (904); objektene hentes i bakgrunnen."""
+    url    = f"{VEGOBJ_API}/vegobjekter/{OBJ_BK}"
+    params = {
+        "fylke":              FYLKE,
+        "vegsystemreferanse": VEGSYSTEMREF,
+        "antall":             1000,
+        "inkluder":           "egenskaper,lokasjon,geometri,metadata",
+        "inkluder_egenskaper": "basis",
+        "srid":               SRID,
+    }
+    return iter_paged(session, url, params, label="bk904", prefetch=prefetch)
+
+
+@lru_cache(maxsize=None)
+def _bk_roller(navn: str) -> tuple[str, ...]:
+    """Hva en BK 904-egenskap brukes til, ut fra navnet – beregnes én gang pr distinkt navn."""
+    n = navn.lower()
+    roller = []
+    if any(k in n for k in ("bruksklasse", "helår", "vinter")):
+        roller.append("bk")
+    if "vogntoglengde" in n and not any(k in n for k in ("skiltet", "modul", "tømmer")):
+        roller.append("lengde")
+    if "skiltet" in n and any(k in n for k in ("vogntoglengde", "kjøretøylengde", "lengde")):
+        roller.append("skiltet")
+    return tuple(roller)
+
+
+def hent_bruksklasse_904(
+    session: requests.Session,
+    gdb: str,
+    objekter: Optional[Iterable[Dict[str, Any]]] = None,
+) -> str:
     """
     Maks vogntoglengde (10913):
       18253 = 19.5m / 18254 = 15.0m / 18255 = 12.4m → numerisk direkte
@@ -530,6 +828,8 @@ def hent_bruksklasse_904(session: requests.Session, gdb: str) -> str:
               'Maks vogntoglengde 13,30 meter.' → 13.3
     """
     log("Henter bruksklasse normaltransport (904) med posisjon...")
+    if objekter is None:
+        objekter = les_bruksklasse_904(session)
 
     fields = [
         ("NVDB_ID",         "LONG"),
@@ -544,17 +844,13 @@ def hent_bruksklasse_904(session: requests.Session, gdb: str) -> str:
         ("GYLDIG_TIL",      "TEXT",   20),
         ("ALLE_EG",         "TEXT", 2000),
     ]
-    fc = create_fc(gdb, "Bruksklasse_904", "POLYLINE", fields)
+    fc = create_fc(STAGE_WS, "Bruksklasse_904", "POLYLINE", fields)
 
-    url    = f"{VEGOBJ_API}/vegobjekter/{OBJ_BK}"
-    params = {
-        "fylke":              FYLKE,
-        "vegsystemreferanse": VEGSYSTEMREF,
-        "antall":             1000,
-        "inkluder":           "egenskaper,lokasjon,geometri,metadata",
-        "srid":               SRID,
-        "alle_versjoner":     "false",
-    }
+    WANTED = (
+        ("merknad",         ("merknad",)),
+        ("strekningsbeskr", ("strekningsbeskrivelse",)),
+        ("vegliste",        ("vegliste",)),
+    )
 
     cnt      = 0
     spes_cnt = 0
@@ -567,7 +863,8 @@ def hent_bruksklasse_904(session: requests.Session, gdb: str) -> str:
     ]
 
     with arcpy.da.InsertCursor(fc, cols) as cur:
-        for o in iter_paged(session, url, params, label="bk904"):
+        ins = cur.insertRow
+        for o in objekter:
             eg = o.get("egenskaper", []) or []
 
             bk_text         = None
@@ -575,60 +872,57 @@ def hent_bruksklasse_904(session: requests.Session, gdb: str) -> str:
             maks_len        = None
             er_spes         = "NEI"
             spes_len        = None
-            merknad_tekst   = eg_verdi(eg, "merknad")
-            strekningsbeskr = eg_verdi(eg, "strekningsbeskrivelse")
-            vegliste_info   = eg_verdi(eg, "vegliste")
+            ev              = scan_eg(eg, WANTED)
+            merknad_tekst   = eg_tekst(ev.get("merknad"))
+            strekningsbeskr = eg_tekst(ev.get("strekningsbeskr"))
+            vegliste_info   = eg_tekst(ev.get("vegliste"))
 
             meta       = o.get("metadata") or {}
             gyldig_fra = str(meta.get("startdato") or "") or None
             gyldig_til = str(meta.get("sluttdato") or "") or None
 
             for e in eg:
-                enavn = (e.get("navn") or "").lower()
-                val   = e.get("verdi")
-
-                if any(k in enavn for k in ("bruksklasse", "helår", "vinter")):
-                    if bk_text is None and val is not None:
-                        bk_text = str(val).strip()
-                        bk_val  = parse_tonn_from_text(bk_text)
-
-                if (
-                    "vogntoglengde" in enavn
-                    and "skiltet"   not in enavn
-                    and "modul"     not in enavn
-                    and "tømmer"    not in enavn
-                    and val is not None
-                ):
-                    parsed = parse_float_any(val)
-                    if parsed is not None:
-                        if maks_len is None:
-                            maks_len = parsed
-                    else:
-                        if "spes" in str(val).lower():
+                val = e.get("verdi")
+                if val is None:
+                    continue
+                for rolle in _bk_roller(e.get("navn") or ""):
+                    if rolle == "bk":
+                        if bk_text is None:
+                            bk_text = str(val).strip()
+                            bk_val  = parse_tonn_from_text(bk_text)
+                    elif rolle == "lengde":
+                        parsed = parse_float_any(val)
+                        if parsed is not None:
+                            if maks_len is None:
+                                maks_len = parsed
+                        elif "spes" in str(val).lower():
                             er_spes = "JA"
-
-                if (
-                    "skiltet" in enavn
-                    and (
-                        "vogntoglengde"     in enavn
-                        or "kjøretøylengde" in enavn
-                        or "lengde"         in enavn
-                    )
-                    and val is not None
-                ):
-                    parsed = parse_float_any(val)
-                    if parsed is not None:
-                        spes_len = parsed
+                    else:   # "skiltet"
+                        parsed = parse_float_any(val)
+                        if parsed is not None:
+                            spes_len = parsed
 
             # Spes: skiltet-felt → Merknad som fallback
             if er_spes == "JA":
                 if spes_len is not None:
                     maks_len = spes_len
                 elif merknad_tekst is not None:
-                    parsed = parse_float_any(merknad_tekst)
+                    # Tall med meter-enhet først; ellers første tall i merknaden som før
+                    m = _merknad_len_re.search(merknad_tekst)
+                    parsed = (
+                        float(m.group(1).replace(",", ".")) if m
+                        else parse_float_any(merknad_tekst)
+                    )
                     if parsed is not None:
                         maks_len = parsed
 
+            stedf = [
+                s for s in (o.get("lokasjon") or {}).get("stedfestinger") or ()
+                if s.get("veglenkesekvensid")
+            ]
+            if not stedf:
+                continue
+
             geom = to_geometry(o.get("geometri"))
             if not geom:
                 continue
@@ -638,17 +932,15 @@ def hent_bruksklasse_904(session: requests.Session, gdb: str) -> str:
 
             alle_eg = alle_eg_tekst(eg)
 
-            for s in (o.get("lokasjon") or {}).get("stedfestinger", []) or []:
-                if not s.get("veglenkesekvensid"):
-                    continue
-                safe_insert(
-                    cur,
-                    (
+            nvdb_id = o["id"]
+            for s in stedf:
+                try:
+                    ins((
                         geom,
-                        int(s["veglenkesekvensid"]),
-                        float(s.get("startposisjon", 0.0)),
-                        float(s.get("sluttposisjon",  0.0)),
-                        int(o["id"]),
+                        s["veglenkesekvensid"],
+                        s.get("startposisjon") or 0.0,
+                        s.get("sluttposisjon") or 0.0,
+                        nvdb_id,
                         bk_val,
                         bk_text,
                         maks_len,
@@ -659,12 +951,14 @@ def hent_bruksklasse_904(session: requests.Session, gdb: str) -> str:
                         gyldig_fra,
                         gyldig_til,
                         alle_eg,
-                    ),
-                    err_prefix=f"[bk904 id={o.get('id')}] insert-feil",
-                    err_counter=err,
-                )
+                    ))
+                except Exception as e:
+                    err["n"] += 1
+                    if err["n"] <= 10:
+                        log(f"[bk904 id={nvdb_id}] insert-feil: {e}")
                 cnt += 1
 
+    fc = lagre_fc(fc, gdb)
     log(f"Bruksklasse 904 ferdig: {cnt} rader  (herav Spes-objekter: {spes_cnt})")
     if spes_cnt:
         spes_null = sum(
@@ -683,8 +977,28 @@ def hent_bruksklasse_904(session: requests.Session, gdb: str) -> str:
 # -------------------------
 # 4. HØYDEBEGRENSNING (591)
 # -------------------------
-def hent_hoydebegrensning(session: requests.Session, gdb: str) -> str:
+def les_hoydebegrensning(session: requests.Session, prefetch: int = PREFETCH_SIDER) -> Iterable[Dict[str, Any]]:
+    """Starter nedlastingen av høydebegrensningene (591); objektene hentes i bakgrunnen."""
+    url    = f"{VEGOBJ_API}/vegobjekter/{OBJ_HOY}"
+    params = {
+        "fylke":              FYLKE,
+        "vegsystemreferanse": VEGSYSTEMREF,
+        "antall":             1000,
+        "inkluder":           "egenskaper,lokasjon,geometri,metadata",
+        "inkluder_egenskaper": "basis",
+        "srid":               SRID,
+    }
+    return iter_paged(session, url, params, label="hoyde591", prefetch=prefetch)
+
+
+def hent_hoydebegrensning(
+    session: requests.Session,
+    gdb: str,
+    objekter: Optional[Iterable[Dict[str, Any]]] = None,
+) -> str:
     log("Henter høydebegrensning (591) med posisjon...")
+    if objekter is None:
+        objekter = les_hoydebegrensning(session)
 
     fields = [
         ("NVDB_ID",          "LONG"),
@@ -702,17 +1016,20 @@ def hent_hoydebegrensning(session: requests.Session, gdb: str) -> str:
         ("GYLDIG_TIL",       "TEXT",   20),
         ("ALLE_EG",          "TEXT", 2000),
     ]
-    fc = create_fc(gdb, "Hoydebegrensning_591", "POINT", fields)
-
-    url    = f"{VEGOBJ_API}/vegobjekter/{OBJ_HOY}"
-    params = {
-        "fylke":              FYLKE,
-        "vegsystemreferanse": VEGSYSTEMREF,
-        "antall":             1000,
-        "inkluder":           "egenskaper,lokasjon,geometri,metadata",
-        "srid":               SRID,
-        "alle_versjoner":     "false",
-    }
+    fc = create_fc(STAGE_WS, "Hoydebegrensning_591", "POINT", fields)
+
+    WANTED = (
+        ("hoyde",       ("skilta høyde", "skiltet høyde", "fri høyde", "frihøyde")),
+        ("beregnet",    ("beregnet høyde",)),
+        ("h_midt",      ("h-min, midt", "midt")),
+        ("h_venstre",   ("h-min, venstre",)),
+        ("h_hoyre",     ("h-min, høyre",)),
+        ("type",        ("type hinder", "type")),
+        ("navn",        ("navn",)),
+        ("maalemetode", ("målemetode", "maalemetode")),
+        ("maaledato",   ("måledato", "maaledato")),
+        ("merknad",     ("merknad",)),
+    )
 
     cnt  = 0
     cols = [
@@ -724,29 +1041,39 @@ def hent_hoydebegrensning(session: requests.Session, gdb: str) -> str:
     ]
 
     with arcpy.da.InsertCursor(fc, cols) as cur:
-        for o in iter_paged(session, url, params, label="hoyde591"):
+        ins = cur.insertRow
+        for o in objekter:
             eg    = o.get("egenskaper", []) or []
 
+            ev    = scan_eg(eg, WANTED)
+
             # Skiltet høyde — primær filterbetingelse
-            e_h   = pick_property(eg, ["skilta høyde", "skiltet høyde", "fri høyde", "frihøyde"])
+            e_h   = ev.get("hoyde")
             hoyde = parse_float_any(e_h.get("verdi")) if e_h else None
             if hoyde is None:
                 continue
 
-            beregnet    = parse_float_any(eg_verdi(eg, "beregnet høyde"))
-            h_midt      = parse_float_any(eg_verdi(eg, "h-min, midt", "midt"))
-            h_venstre   = parse_float_any(eg_verdi(eg, "h-min, venstre"))
-            h_hoyre     = parse_float_any(eg_verdi(eg, "h-min, høyre"))
-            typ         = eg_verdi(eg, "type hinder", "type")
-            hinder_navn = eg_verdi(eg, "navn")
-            maalemetode = eg_verdi(eg, "målemetode", "maalemetode")
-            maaledato   = eg_verdi(eg, "måledato", "maaledato")
-            merknad     = eg_verdi(eg, "merknad")
+            beregnet    = parse_float_any(eg_tekst(ev.get("beregnet")))
+            h_midt      = parse_float_any(eg_tekst(ev.get("h_midt")))
+            h_venstre   = parse_float_any(eg_tekst(ev.get("h_venstre")))
+            h_hoyre     = parse_float_any(eg_tekst(ev.get("h_hoyre")))
+            typ         = eg_tekst(ev.get("type"))
+            hinder_navn = eg_tekst(ev.get("navn"))
+            maalemetode = eg_tekst(ev.get("maalemetode"))
+            maaledato   = eg_tekst(ev.get("maaledato"))
+            merknad     = eg_tekst(ev.get("merknad"))
 
             meta       = o.get("metadata") or {}
             gyldig_fra = str(meta.get("startdato") or "") or None
             gyldig_til = str(meta.get("sluttdato") or "") or None
 
+            stedf = [
+                s for s in (o.get("lokasjon") or {}).get("stedfestinger") or ()
+                if s.get("veglenkesekvensid")
+            ]
+            if not stedf:
+                continue
+
             geom = to_geometry(o.get("geometri"))
             if not geom:
                 continue
@@ -755,17 +1082,16 @@ def hent_hoydebegrensning(session: requests.Session, gdb: str) -> str:
 
             alle_eg = alle_eg_tekst(eg)
 
-            for s in (o.get("lokasjon") or {}).get("stedfestinger", []) or []:
-                if not s.get("veglenkesekvensid"):
-                    continue
-                startpos = float(s.get("startposisjon", 0.0))
-                sluttpos = float(s.get("sluttposisjon", startpos))
-                cur.insertRow((
+            nvdb_id = o["id"]
+            for s in stedf:
+                startpos = s.get("startposisjon") or 0.0
+                sluttpos = s.get("sluttposisjon", startpos)
+                ins((
                     geom,
-                    int(s["veglenkesekvensid"]),
+                    s["veglenkesekvensid"],
                     startpos,
                     sluttpos,
-                    int(o["id"]),
+                    nvdb_id,
                     hoyde,
                     beregnet,
                     h_midt,
@@ -782,6 +1108,7 @@ def hent_hoydebegrensning(session: requests.Session, gdb: str) -> str:
                 ))
                 cnt += 1
 
+    fc = lagre_fc(fc, gdb)
     log(f"Høydebegrensning ferdig: {cnt} punkter")
     return fc
 
@@ -789,20 +1116,21 @@ def hent_hoydebegrensning(session: requests.Session, gdb: str) -> str:
 # MAIN
 # -------------------------
 if __name__ == "__main__":
-    session = create_session()
     create_gdb(OUT_GDB)
 
-    log("=" * 60)
-    hent_vegnett(session, OUT_GDB)
-
-    log("=" * 60)
-    hent_bruer(session, OUT_GDB)
-
-    log("=" * 60)
-    hent_bruksklasse_904(session, OUT_GDB)
-
-    log("=" * 60)
-    hent_hoydebegrensning(session, OUT_GDB)
+    # Alle fire nedlastingene startes med en gang, hver i sin bakgrunnstråd med egen
+    # Session (requests.Session er ikke trådsikker). GDB-skrivingen går fortsatt ett lag
+    # om gangen i hovedtråden mens de neste lagene lastes ned
+    sesjoner = [create_session() for _ in range(4)]
+    jobber = [
+        (hent_vegnett,          les_vegnett(sesjoner[0])),
+        (hent_bruer,            les_bruer(sesjoner[1],            prefetch=PREFETCH_VENTENDE)),
+        (hent_bruksklasse_904,  les_bruksklasse_904(sesjoner[2],  prefetch=PREFETCH_VENTENDE)),
+        (hent_hoydebegrensning, les_hoydebegrensning(sesjoner[3], prefetch=PREFETCH_VENTENDE)),
+    ]
+    for (hent, objekter), session in zip(jobber, sesjoner):
+        log("=" * 60)
+        hent(session, OUT_GDB, objekter)
 
     log("=" * 60)
     log(f"✅ NVDB → GDB ferdig: {OUT_GDB}")
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+profil_common.py
+
+Felles hjelpefunksjoner for Normaltransport-stegene (02 bygg profil, 04 flaskehalser, 05 årsak):
+  - lesing/skriving av feature classes og feltsjekk (med cache på ListFields)
+
+Intervall-oppslagene (NumPy-SoA + overlapp/min) ligger i profil_intervall.py, uten arcpy.
+
+Importeres fra skriptene i samme mappe; ingen egen kjøring.
+"""
+
+from __future__ import annotations
+import os
+from contextlib import nullcontext
+
+import arcpy
+
+try:
+    import pyogrio   # valgfri: attributtlesing i C via GDAL (OpenFileGDB)
+except ImportError:
+    pyogrio = None
+
+
+def les_felt(fc, felt):
+    """Leser attributtfelt (uten geometri) fra fc som liste av tupler i felt-rekkefølge.
+
+    Med pyogrio leses hele tabellen i én operasjon; ellers arcpy.da.SearchCursor.
+    "OID@" gir OBJECTID (= FID i OpenFileGDB-driveren). NULL blir None.
+    """
+    if pyogrio is None:
+        with arcpy.da.SearchCursor(fc, felt) as cur:
+            return list(cur)
+    df = pyogrio.read_dataframe(
+        os.path.dirname(fc), layer=os.path.basename(fc),
+        columns=[f for f in felt if f != "OID@"],
+        read_geometry=False, fid_as_index=True,
+    )
+    df = df.astype(object).where(df.notna(), None)
+    return list(zip(*(df.index.tolist() if f == "OID@" else df[f].tolist() for f in felt)))
+
+
+def skriv_rader(fc, cols, rader):
+    """Skriver ferdig beregnede rader i én samlet innsetting (ingen beregning inne i cursoren).
+
+    Én edit-sesjon rundt hele innsettingen → én commit i stedet for per rad.
+    I memory-workspace trengs ingen edit-sesjon.
+    """
+    ws = os.path.dirname(fc)
+    with nullcontext() if ws.lower() in ("in_memory", "memory") else arcpy.da.Editor(ws):
+        with arcpy.da.InsertCursor(fc, cols) as icur:
+            for rad in rader:
+                icur.insertRow(rad)
+
+
+# fc -> sett med feltnavn; ListFields kjøres én gang pr fc, AddField oppdaterer settet
+_felt_cache = {}
+
+
+def field_set(fc):
+    if fc not in _felt_cache:
+        _felt_cache[fc] = {f.name for f in arcpy.ListFields(fc)}
+    return _felt_cache[fc]
+
+
+def glem_felt(fc):
+    """Nullstiller feltcachen for fc (etter Delete/CreateFeatureclass)."""
+    _felt_cache.pop(fc, None)
+
+
+def ensure_fields(fc, defs):
+    """Legger til manglende felt fra defs [(navn, type, lengde|None), ...] i ett AddFields-kall."""
+    existing = field_set(fc)
+    nye = [
+        [name, ftype] if length is None else [name, ftype, "", length]
+        for name, ftype, length in defs
+        if name not in existing
+    ]
+    if not nye:
+        return
+    arcpy.management.AddFields(fc, nye)
+    existing.update(f[0] for f in nye)
+
+
+def require_fc(path):
+    if not arcpy.Exists(path):
+        raise RuntimeError(f"Mangler feature class: {path}")
+
+
+def check_fields(fc, needed):
+    fields  = field_set(fc)
+    missing = [n for n in needed if n not in fields]
+    if missing:
+        raise RuntimeError(f"{os.path.basename(fc)} mangler felt: {missing}")
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+profil_intervall.py
+
+Intervall-oppslag per VEGLENKESEKV_ID som NumPy-SoA + vektorisert overlapp/min, og
+overlapp-reduksjonen for 02 bygg profil (reduser_vid / reduser_bolk).
+
+Importerer ikke arcpy, slik at prosesspool-workerne slipper å laste den for å hente
+funksjonene. Importeres fra skriptene i samme mappe; ingen egen kjøring.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+try:
+    from numba import njit   # valgfri: kompilert min-reduksjon over treffparene
+except ImportError:
+    njit = None
+
+EPS         = 1e-9
+TETT_GRENSE = 4096   # segmenter × vindu; over dette avgrenses kandidatene pr segment
+
+
+def til_soa(rader, verdier):
+    """[(vid, s0, s1, *verdier), ...] blir vid -> dict med NumPy-arrays (SoA), sortert på s0.
+
+    verdier: [(navn, dtype), ...] for elementene etter s0/s1. None blir NaN i float-arrays.
+    Alle rader ligger i én sammenhengende array pr kolonne, sortert på (vid, s0); hver vid
+    får views (arr[start:slutt]) inn i disse i stedet for egne små arrays.
+    "maks_s1" (løpende maks av s1 innen vid) gjør at searchsorted kan avgrense
+    kandidatvinduet selv om intervallene overlapper hverandre.
+    """
+    if not rader:
+        return {}
+    cols = list(zip(*rader))
+    vid  = np.array(cols[0], dtype=np.int64)
+    s0   = np.array(cols[1], dtype=float)
+    s1   = np.array(cols[2], dtype=float)
+    rekkefolge = np.lexsort((s0, vid))
+    vid, s0, s1 = vid[rekkefolge], s0[rekkefolge], s1[rekkefolge]
+    kolonner = {
+        navn: np.array(col, dtype=dtype)[rekkefolge]
+        for (navn, dtype), col in zip(verdier, cols[3:])
+    }
+
+    unike, start = np.unique(vid, return_index=True)
+    slutt   = np.append(start[1:], len(vid))
+    maks_s1 = np.empty_like(s1)
+    out = {}
+    for v, a, b in zip(unike.tolist(), start.tolist(), slutt.tolist()):
+        np.maximum.accumulate(s1[a:b], out=maks_s1[a:b])
+        d = {"s0": s0[a:b], "s1": s1[a:b], "maks_s1": maks_s1[a:b]}
+        for navn, arr in kolonner.items():
+            d[navn] = arr[a:b]
+        out[v] = d
+    return out
+
+
+def overlapp_treff(d, v0s, v1s, strict=True):
+    """(rad, kol) for alle overlappende par Vegnett-segment rad / intervall kol i d.
+
+    Små vid-er: tett maske over ett felles vindu (searchsorted på løpende maks s1 / s0).
+    Når segmenter × vindu passerer TETT_GRENSE avgrenses kandidatene pr segment i stedet
+    (O(log N) pr segment + antall kandidater), så én lang BK-strekning ikke gjør vinduet
+    til hele vid-en for alle segmenter. Parene er sortert på rad, deretter kol (s0-rekkefølge).
+    """
+    lo = np.searchsorted(d["maks_s1"], v0s.min() - EPS, side="left")
+    hi = max(lo, np.searchsorted(d["s0"], v1s.max() + EPS, side="right"))
+    if len(v0s) * (hi - lo) <= TETT_GRENSE:
+        left  = np.maximum(d["s0"][lo:hi][None, :], v0s[:, None])
+        right = np.minimum(d["s1"][lo:hi][None, :], v1s[:, None])
+        rad, kol = np.nonzero(left < right - EPS if strict else left <= right + EPS)
+        return rad, kol + lo
+
+    lo  = np.searchsorted(d["maks_s1"], v0s - EPS, side="left")
+    hi  = np.maximum(lo, np.searchsorted(d["s0"], v1s + EPS, side="right"))
+    ant = hi - lo
+    rad = np.repeat(np.arange(len(v0s)), ant)
+    kol = np.arange(ant.sum()) + np.repeat(lo - (np.cumsum(ant) - ant), ant)
+    left  = np.maximum(d["s0"][kol], v0s[rad])
+    right = np.minimum(d["s1"][kol], v1s[rad])
+    ok = left < right - EPS if strict else left <= right + EPS
+    return rad[ok], kol[ok]
+
+
+def _min_pr_rad_kjerne(vals, rad, kol, res):
+    for i in range(len(rad)):
+        v = vals[kol[i]]
+        if v < res[rad[i]]:   # NaN < x er usann → NaN hoppes over
+            res[rad[i]] = v
+
+
+if njit is not None:
+    _min_pr_rad_kjerne = njit(cache=True)(_min_pr_rad_kjerne)
+
+
+def min_pr_rad(vals, rad, kol, n):
+    """Minste ikke-NaN vals[kol] pr rad (0..n-1); None der det ikke er treff.
+
+    Med numba én kompilert løkke over treffparene; ellers fmin.at (hopper over NaN selv).
+    """
+    res = np.full(n, np.inf)
+    if njit is not None:
+        _min_pr_rad_kjerne(vals, rad, kol, res)
+    else:
+        np.fmin.at(res, rad, vals[kol])
+    return [None if x == np.inf else x for x in res.tolist()]
+
+
+def int_or_none(x):
+    return None if x is None else int(x)
+
+
+def reduser_vid(strict_bru, v0s, v1s, bk, bru, hoy):
+    """Overlapp + min for alle Vegnett-segmenter på én vid (ren NumPy, ingen arcpy).
+
+    bk/bru/hoy er SoA-dictene for vid-en (None om vid-en mangler i indeksen);
+    strict_bru er STRICT_OVERLAP fra 02 (bru-overlapp uten kantberøring).
+    Returnerer lister pr segment: (bk_vals, bk_txts, maks_lens, er_spes, min_brus, min_hs)
+    der bk_txts er BK_TEKST-koder (0 = ingen tekst).
+    """
+    n = len(v0s)
+
+    # --- BK (904): strict=False for å fange kantberøring ---
+    bk_vals = maks_lens = [None] * n
+    bk_txts = [0] * n
+    er_spes_rad = [False] * n
+    if bk is not None:
+        rad, kol = overlapp_treff(bk, v0s, v1s, strict=False)
+        if len(rad):
+            bk_vals   = [int_or_none(x) for x in min_pr_rad(bk["bk"], rad, kol, n)]
+            maks_lens = min_pr_rad(bk["maks_len"], rad, kol, n)
+            # Første ikke-tomme BK_TEKST (kode > 0) blant treffene (i s0-rekkefølge)
+            txt  = bk["txt"][kol]
+            m    = txt > 0
+            r, forste = np.unique(rad[m], return_index=True)
+            koder = np.zeros(n, dtype=np.int32)
+            koder[r] = txt[m][forste]
+            bk_txts = koder.tolist()
+            # ER_SPES = "JA" hvis minst ett overlappende segment er Spes (bare når vid-en har Spes)
+            if bk["har_spes"]:
+                spes = np.zeros(n, dtype=bool)
+                spes[rad[bk["er_spes"][kol]]] = True
+                er_spes_rad = spes.tolist()
+
+    # --- Bru: minste tillatte tonn ---
+    min_brus = [None] * n
+    if bru is not None:
+        rad, kol = overlapp_treff(bru, v0s, v1s, strict=strict_bru)
+        min_brus = [int_or_none(x) for x in min_pr_rad(bru["tonn"], rad, kol, n)]
+
+    # --- Høyde: punkt-objekter, tillat touch ---
+    min_hs = [None] * n
+    if hoy is not None:
+        rad, kol = overlapp_treff(hoy, v0s, v1s, strict=False)
+        min_hs = min_pr_rad(hoy["hoyde"], rad, kol, n)
+
+    return bk_vals, bk_txts, maks_lens, er_spes_rad, min_brus, min_hs
+
+
+def reduser_bolk(strict_bru, bolk):
+    """Worker-jobb: bolk = [(v0s, v1s, bk, bru, hoy), ...] → [reduser_vid(...), ...]."""
+    return [reduser_vid(strict_bru, *args) for args in bolk]